@@ -1,13 +1,18 @@
 import json
 from typing import List, Dict, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import datetime
 from ..db.models import ForcedAction, ForcedActionStatus, AuditLog
+from ..db.routing import ReplicaRouter
 from ..services.rng_service import RNGService
 
 class ForceFlowService:
-    def __init__(self, db: Session, rng_service: RNGService, admin_ids: List[int], confirm_threshold: int = 2):
+    def __init__(self, db: Session, rng_service: RNGService, admin_ids: List[int], confirm_threshold: int = 2,
+                 router: Optional[ReplicaRouter] = None):
         self.db = db
+        # History queries go to a replica through the router; writes always use self.db
+        self.router = router
         self.rng_service = rng_service
         self.admin_ids = admin_ids
         self.confirm_threshold = confirm_threshold
@@ -137,10 +142,14 @@ class ForceFlowService:
         return self.db.execute(query).fetchall()
 
     def get_force_history(self, chat_id: Optional[int] = None, limit: int = 10) -> List[ForcedAction]:
-        """Get force action history."""
-        query = "SELECT * FROM forced_actions WHERE 1=1"
+        """Get force action history, from a replica when one is fresh enough."""
+        query = select(ForcedAction)
         if chat_id:
-            query += f" AND chat_id = {chat_id}"
-        query += f" ORDER BY requested_at DESC LIMIT {limit}"
+            query = query.where(ForcedAction.chat_id == chat_id)
+        query = query.order_by(ForcedAction.requested_at.desc()).limit(limit)
         
-        return self.db.execute(query).fetchall()
+        if not self.router:
+            return self.db.execute(query).scalars().all()
+        
+        with self.router.read_session() as db:
+            return db.execute(query).scalars().all()
@@ -0,0 +1,313 @@
+"""
+Public read-only round verification API.
+
+    uvicorn src.api.main:app --port 8001
+
+Revealed rounds never change, so their JSON bodies are computed once (one
+seed decryption each) and served from memory with a strong ETag and an
+immutable Cache-Control. Pending rounds only expose their commitment.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db.models import ProvableSeed, RoundClientSeeds
+from ..db.routing import ReplicaRouter
+from ..services.rng_service import RNGService
+from ..utils.crypto import decrypt_seed
+from .. import verifier
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PENDING_CACHE_CONTROL = "public, max-age=5, must-revalidate"
+STREAM_BATCH_SIZE = 500
+DAILY_PERIOD_PREFIX = "daily_"
+
+# Everything here is read-only, so it all goes to replicas when they are configured
+router = ReplicaRouter.from_urls(
+    os.getenv('DATABASE_URL', 'sqlite:///./lottery.db'),
+    [url for url in os.getenv('REPLICA_DATABASE_URLS', '').split(',') if url],
+    max_lag_seconds=float(os.getenv('REPLICA_MAX_LAG_SECONDS', 2.0))
+)
+rng_service = RNGService(os.getenv('SEED_ENCRYPTION_KEY', 'default-key-change-in-production'), router)
+
+
+class RevealedRoundCache:
+    """Bounded LRU of pre-serialized revealed rounds: round_id -> (body, etag)."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, round_id: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(round_id)
+            if entry is not None:
+                self._entries.move_to_end(round_id)
+            return entry
+
+    def put(self, round_id: str, body: bytes) -> Tuple[bytes, str]:
+        entry = (body, _etag(body))
+        with self._lock:
+            self._entries[round_id] = entry
+            self._entries.move_to_end(round_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+revealed_cache = RevealedRoundCache(int(os.getenv('API_CACHE_SIZE', 10000)))
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _dumps(payload: Dict) -> bytes:
+    return json.dumps(payload, separators=(',', ':'), sort_keys=True).encode()
+
+
+def _pending_payload(seed_record: ProvableSeed) -> Dict:
+    return {
+        'id': seed_record.id,
+        'round_id': seed_record.round_id,
+        'period_tag': seed_record.period_tag,
+        'commitment': seed_record.commitment,
+        'status': 'pending',
+    }
+
+
+def _revealed_payload(seed_record: ProvableSeed, snapshot: Optional[RoundClientSeeds]) -> Dict:
+    server_seed = decrypt_seed(seed_record.encrypted_seed, rng_service.encryption_key)
+    if verifier.commitment_for(server_seed) != seed_record.commitment:
+        raise ValueError(f"Commitment verification failed for round {seed_record.round_id}")
+
+    digits = verifier.compute_digits(server_seed, seed_record.round_id)
+    payload = {
+        'id': seed_record.id,
+        'round_id': seed_record.round_id,
+        'period_tag': seed_record.period_tag,
+        'commitment': seed_record.commitment,
+        'server_seed': server_seed,
+        'digits': digits,
+        'revealed_at': seed_record.revealed_at.isoformat(),
+        'status': 'revealed',
+        'client_seeds': snapshot.seeds if snapshot is not None else {},
+        'client_seeds_digest': snapshot.digest if snapshot is not None else verifier.client_seeds_digest({}),
+    }
+    payload.update(verifier.outcome(digits))
+    return payload
+
+
+def load_snapshots(db: Session, seed_records) -> Dict[str, RoundClientSeeds]:
+    """
+    Client-seed snapshots for the revealed, not yet cached rounds among
+    seed_records, in one query. Snapshots are taken at lock time so the
+    replica normally has them; any it lacks are read from the primary.
+    """
+    round_ids = [
+        seed_record.round_id for seed_record in seed_records
+        if seed_record.revealed_at is not None and revealed_cache.get(seed_record.round_id) is None
+    ]
+    if not round_ids:
+        return {}
+
+    query = select(RoundClientSeeds).where(RoundClientSeeds.round_id.in_(round_ids))
+    snapshots = {snapshot.round_id: snapshot for snapshot in db.execute(query).scalars()}
+    missing = [round_id for round_id in round_ids if round_id not in snapshots]
+    if missing:
+        with router.primary_session() as primary:
+            snapshots.update(
+                (snapshot.round_id, snapshot) for snapshot in primary.execute(
+                    select(RoundClientSeeds).where(RoundClientSeeds.round_id.in_(missing))
+                ).scalars()
+            )
+    return snapshots
+
+
+def round_body(seed_record: ProvableSeed,
+               snapshots: Dict[str, RoundClientSeeds]) -> Tuple[bytes, str, bool]:
+    """
+    Serialized body, ETag and immutability flag for a round. `snapshots`
+    comes from load_snapshots. A revealed round without a snapshot is served
+    but not cached, so it is filled in once the snapshot is visible.
+    """
+    if seed_record.revealed_at is None:
+        body = _dumps(_pending_payload(seed_record))
+        return body, _etag(body), False
+
+    cached = revealed_cache.get(seed_record.round_id)
+    if cached is not None:
+        return cached[0], cached[1], True
+
+    snapshot = snapshots.get(seed_record.round_id)
+    body = _dumps(_revealed_payload(seed_record, snapshot))
+    if snapshot is None:
+        return body, _etag(body), False
+    body, etag = revealed_cache.put(seed_record.round_id, body)
+    return body, etag, True
+
+
+def round_body_or_error(seed_record: ProvableSeed,
+                        snapshots: Dict[str, RoundClientSeeds]) -> Tuple[bytes, str, bool, bool]:
+    """
+    round_body plus an ok flag. A revealed record that fails to decrypt or
+    verify is logged and replaced by an uncached error entry, so one bad row
+    doesn't break a period or a bulk export.
+    """
+    try:
+        return round_body(seed_record, snapshots) + (True,)
+    except Exception as e:
+        logger.error("Round %s could not be served: %s", seed_record.round_id, e)
+        body = _dumps({'round_id': seed_record.round_id, 'error': "round failed verification"})
+        return body, _etag(body), False, False
+
+
+def period_closed(period_tag: str, today: Optional[date] = None) -> bool:
+    """Whether a period can gain no more rounds. Only daily_YYYY-MM-DD tags are known to close."""
+    if not period_tag.startswith(DAILY_PERIOD_PREFIX):
+        return False
+    try:
+        day = date.fromisoformat(period_tag[len(DAILY_PERIOD_PREFIX):])
+    except ValueError:
+        return False
+    return day < (today or datetime.utcnow().date())
+
+
+def warm_cache(db: Session, limit: int) -> int:
+    """Precompute the most recently revealed rounds. A bad record is logged and skipped."""
+    seed_records = db.execute(
+        select(ProvableSeed)
+        .where(ProvableSeed.revealed_at.isnot(None))
+        .order_by(ProvableSeed.revealed_at.desc())
+        .limit(limit)
+    ).scalars().all()
+
+    snapshots = load_snapshots(db, seed_records)
+    warmed = 0
+    for seed_record in reversed(seed_records):
+        try:
+            round_body(seed_record, snapshots)
+            warmed += 1
+        except Exception as e:
+            logger.warning("Could not precompute round %s: %s", seed_record.round_id, e)
+    return warmed
+
+
+def get_db() -> Iterator[Session]:
+    with router.read_session() as db:
+        yield db
+
+
+app = FastAPI(title="Quick Lottery round verification")
+
+
+@app.on_event("startup")
+def _warm_on_startup():
+    warm_limit = int(os.getenv('API_CACHE_WARM', 1000))
+    if warm_limit:
+        with router.read_session() as db:
+            warm_cache(db, warm_limit)
+
+
+def _conditional_response(request: Request, body: bytes, etag: str,
+                          cache_control: str, media_type: str = "application/json") -> Response:
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@app.get("/rounds/{round_id}")
+def get_round(round_id: str, request: Request):
+    cached = revealed_cache.get(round_id)
+    if cached is not None:
+        return _conditional_response(request, cached[0], cached[1], IMMUTABLE_CACHE_CONTROL)
+
+    # Pending and unknown rounds are read from the primary so a fresh round isn't a 404
+    seed_record = rng_service.find_seed_for_round(round_id)
+    if not seed_record:
+        raise HTTPException(status_code=404, detail="Round not found")
+
+    with router.read_session() as db:
+        snapshots = load_snapshots(db, [seed_record])
+    body, etag, immutable, ok = round_body_or_error(seed_record, snapshots)
+    if not ok:
+        return JSONResponse(json.loads(body), status_code=500, headers={'Cache-Control': 'no-store'})
+    return _conditional_response(
+        request, body, etag, IMMUTABLE_CACHE_CONTROL if immutable else PENDING_CACHE_CONTROL
+    )
+
+
+@app.get("/periods/{period_tag}")
+def get_period(period_tag: str, request: Request, db: Session = Depends(get_db)):
+    seed_records = db.execute(
+        select(ProvableSeed)
+        .where(ProvableSeed.period_tag == period_tag)
+        .order_by(ProvableSeed.id)
+    ).scalars().all()
+    if not seed_records:
+        raise HTTPException(status_code=404, detail="Period not found")
+
+    snapshots = load_snapshots(db, seed_records)
+    bodies = [round_body_or_error(seed_record, snapshots) for seed_record in seed_records]
+    body = b'{"period_tag":' + json.dumps(period_tag).encode() + b',"rounds":[' + \
+        b','.join(item[0] for item in bodies) + b']}'
+    # Every round so far being revealed isn't enough: an open period keeps
+    # gaining rounds, so it is only immutable once it has closed
+    immutable = period_closed(period_tag) and all(item[2] for item in bodies)
+    return _conditional_response(
+        request, body, _etag(body), IMMUTABLE_CACHE_CONTROL if immutable else PENDING_CACHE_CONTROL
+    )
+
+
+def _stream_range(from_id: int, to_id: Optional[int], limit: int) -> Iterator[bytes]:
+    """Keyset-paginate provable_seeds by id and yield one NDJSON line per round."""
+    last_id = from_id - 1
+    remaining = limit
+    with router.read_session() as db:
+        while remaining > 0:
+            query = select(ProvableSeed).where(ProvableSeed.id > last_id)
+            if to_id is not None:
+                query = query.where(ProvableSeed.id <= to_id)
+            seed_records = db.execute(
+                query.order_by(ProvableSeed.id).limit(min(STREAM_BATCH_SIZE, remaining))
+            ).scalars().all()
+            if not seed_records:
+                return
+
+            snapshots = load_snapshots(db, seed_records)
+            for seed_record in seed_records:
+                yield round_body_or_error(seed_record, snapshots)[0] + b'\n'
+            last_id = seed_records[-1].id
+            remaining -= len(seed_records)
+            db.expunge_all()
+
+
+@app.get("/rounds")
+def get_rounds_range(from_id: int = Query(1, ge=1), to_id: Optional[int] = Query(None, ge=1),
+                     limit: int = Query(10000, ge=1, le=100000)):
+    return StreamingResponse(
+        _stream_range(from_id, to_id, limit),
+        media_type="application/x-ndjson",
+        headers={'Cache-Control': 'no-store'},
+    )
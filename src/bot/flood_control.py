@@ -0,0 +1,163 @@
+"""
+Admission control that runs before any handler touches the database.
+
+Registered in group -1 for commands and bets (ADMISSION_FILTER), so plain
+group chatter neither uses up the limits nor gets replies. For each of them it
+- drops duplicates of an update_id already seen,
+- checks per-user and per-chat sliding-window limits,
+in a single Redis round trip (one Lua script) on an asyncio client, which
+should be created with short connect and read timeouts. When Redis is
+unavailable or slow the same decisions are made locally with token buckets.
+Rejected updates stop handler processing and get at most one cached
+"slow down" reply per window.
+"""
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from redis.exceptions import RedisError
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes, filters
+
+from ..utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+ADMITTED = 0
+DUPLICATE = 1
+USER_LIMITED = 2
+CHAT_LIMITED = 3
+
+# Commands and bets (/N100, /S123456 500, ...) all start with a slash
+ADMISSION_FILTER = filters.Regex(r'^/')
+
+# KEYS: dedupe key, user window key, chat window key
+# ARGV: now_ms, window_ms, user_limit, chat_limit, member, dedupe_ttl_s
+SLIDING_WINDOW_LUA = """
+if KEYS[1] ~= '' and redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[6]) == false then
+    return 1
+end
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local checks = {{KEYS[2], tonumber(ARGV[3]), 2}, {KEYS[3], tonumber(ARGV[4]), 3}}
+for _, check in ipairs(checks) do
+    if check[1] ~= '' then
+        redis.call('ZREMRANGEBYSCORE', check[1], '-inf', now - window)
+        if redis.call('ZCARD', check[1]) >= check[2] then
+            return check[3]
+        end
+    end
+end
+for _, check in ipairs(checks) do
+    if check[1] ~= '' then
+        redis.call('ZADD', check[1], now, ARGV[5])
+        redis.call('PEXPIRE', check[1], window)
+    end
+end
+return 0
+"""
+
+class FloodControl:
+    def __init__(self, redis=None, window_seconds: float = 10.0,
+                 user_limit: int = 10, chat_limit: int = 60,
+                 dedupe_ttl: int = 300, redis_retry_seconds: float = 5.0,
+                 reply_text: str = "⏳ Too many requests, please slow down."):
+        self.redis = redis
+        self.window_seconds = window_seconds
+        self.user_limit = user_limit
+        self.chat_limit = chat_limit
+        self.dedupe_ttl = dedupe_ttl
+        self.redis_retry_seconds = redis_retry_seconds
+        self.reply_text = reply_text
+        self._script = redis.register_script(SLIDING_WINDOW_LUA) if redis is not None else None
+        self._redis_down_until = 0.0
+
+        # Local fallback state
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._seen_updates: "OrderedDict[int, None]" = OrderedDict()
+        self._replied: Dict[str, float] = {}
+
+    async def _check_redis(self, update_id: Optional[int], user_id: Optional[int],
+                     chat_id: Optional[int]) -> int:
+        keys = [
+            f"flood:update:{update_id}" if update_id is not None else '',
+            f"flood:user:{user_id}" if user_id is not None else '',
+            f"flood:chat:{chat_id}" if chat_id is not None else '',
+        ]
+        args = [
+            int(time.time() * 1000), int(self.window_seconds * 1000),
+            self.user_limit, self.chat_limit, uuid.uuid4().hex, self.dedupe_ttl,
+        ]
+        return int(await self._script(keys=keys, args=args))
+
+    def _bucket(self, key: str, limit: int) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) > 50000:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.is_idle()}
+            bucket = self._buckets[key] = TokenBucket(limit / self.window_seconds, capacity=limit)
+        return bucket
+
+    def _check_local(self, update_id: Optional[int], user_id: Optional[int],
+                     chat_id: Optional[int]) -> int:
+        if update_id is not None:
+            if update_id in self._seen_updates:
+                return DUPLICATE
+            self._seen_updates[update_id] = None
+            if len(self._seen_updates) > 10000:
+                self._seen_updates.popitem(last=False)
+
+        checks = []
+        if user_id is not None:
+            checks.append((self._bucket(f"user:{user_id}", self.user_limit), USER_LIMITED))
+        if chat_id is not None:
+            checks.append((self._bucket(f"chat:{chat_id}", self.chat_limit), CHAT_LIMITED))
+        for bucket, verdict in checks:
+            if not bucket.can_acquire():
+                return verdict
+        for bucket, _ in checks:
+            bucket.try_acquire()
+        return ADMITTED
+
+    async def check(self, update_id: Optional[int], user_id: Optional[int],
+                    chat_id: Optional[int]) -> int:
+        """Return ADMITTED, DUPLICATE, USER_LIMITED or CHAT_LIMITED."""
+        if self._script is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return await self._check_redis(update_id, user_id, chat_id)
+            except (RedisError, OSError) as e:
+                logger.warning("Flood control falling back to local limits: %s", e)
+                self._redis_down_until = time.monotonic() + self.redis_retry_seconds
+        return self._check_local(update_id, user_id, chat_id)
+
+    def _should_reply(self, key: str) -> bool:
+        """At most one rejection reply per user or chat per window."""
+        now = time.monotonic()
+        if self._replied.get(key, 0) > now:
+            return False
+        if len(self._replied) > 10000:
+            self._replied = {k: until for k, until in self._replied.items() if until > now}
+        self._replied[key] = now + self.window_seconds
+        return True
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        chat = update.effective_chat
+        verdict = await self.check(
+            update.update_id,
+            user.id if user else None,
+            chat.id if chat else None,
+        )
+        if verdict == ADMITTED:
+            return
+
+        if verdict != DUPLICATE and update.effective_message is not None:
+            key = f"user:{user.id}" if verdict == USER_LIMITED and user else f"chat:{chat.id}"
+            if self._should_reply(key):
+                try:
+                    await update.effective_message.reply_text(self.reply_text)
+                except Exception as e:
+                    logger.debug("Could not send flood reply: %s", e)
+        raise ApplicationHandlerStop
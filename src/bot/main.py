@@ -1,14 +1,26 @@
 import os
+import asyncio
 import logging
+import redis.asyncio
 from dotenv import load_dotenv
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from . import handlers
+from . import stats_handlers
+from .flood_control import ADMISSION_FILTER, FloodControl
 from ..db.base import get_db
 from ..services.rng_service import RNGService
 from ..services.payout_service import PayoutService
+from ..services.message_dispatcher import MessageDispatcher
+from ..services.stats_service import StatsService
+from ..services.bet_journal import BetJournal, ExposureLimits
+from ..services.bet_intake import BetIntakeService
+from ..admin.force_flow import ForceFlowService
+from ..db.health import DatabaseHealth
+from ..db.routing import ReplicaRouter
+from ..utils.profiling import UpdateProfiler
 
 # Load environment variables
 load_dotenv()
@@ -26,16 +38,109 @@ class LotteryBot:
         self.engine = create_engine(self.db_url)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
+        # History, verification and reporting reads go to replicas when configured
+        replica_urls = [url for url in os.getenv('REPLICA_DATABASE_URLS', '').split(',') if url]
+        self.router = ReplicaRouter(
+            self.engine,
+            [create_engine(url) for url in replica_urls],
+            max_lag_seconds=float(os.getenv('REPLICA_MAX_LAG_SECONDS', 2.0))
+        )
+        
+        redis_url = os.getenv('REDIS_URL')
+        # Leaderboard updates run on every bet and payout, so they use an async
+        # client that times out instead of blocking the event loop
+        leaderboard_timeout = float(os.getenv('REDIS_TIMEOUT', 0.5))
+        self.redis = redis.asyncio.Redis.from_url(
+            redis_url, socket_connect_timeout=leaderboard_timeout, socket_timeout=leaderboard_timeout
+        ) if redis_url else None
+        # Flood control checks every command on the event loop, so it gets its own
+        # async client that gives up quickly and falls back to local limits
+        redis_timeout = float(os.getenv('FLOOD_REDIS_TIMEOUT', 0.25))
+        self.flood_redis = redis.asyncio.Redis.from_url(
+            redis_url, socket_connect_timeout=redis_timeout, socket_timeout=redis_timeout
+        ) if redis_url else None
+        
         # Initialize services
-        self.rng_service = RNGService(os.getenv('SEED_ENCRYPTION_KEY', 'default-key-change-in-production'))
-        self.payout_service = PayoutService(self.SessionLocal())
+        self.rng_service = RNGService(os.getenv('SEED_ENCRYPTION_KEY', 'default-key-change-in-production'), self.router)
+        payout_db = self.SessionLocal()
+        self.payout_service = PayoutService(
+            payout_db,
+            stats_service=StatsService(payout_db, self.redis),
+            router=self.router
+        )
+        # Forced-outcome history (/forced_history) reads from a replica via the router
+        self.force_flow_service = ForceFlowService(
+            self.SessionLocal(),
+            self.rng_service,
+            [int(admin_id) for admin_id in os.getenv('ADMIN_IDS', '').split(',') if admin_id],
+            confirm_threshold=int(os.getenv('ADMIN_CONFIRM_THRESHOLD', 2)),
+            router=self.router
+        )
+        
+        # Bets go to a local journal while the database is down and are replayed on recovery
+        self.bet_intake = BetIntakeService(
+            self.SessionLocal,
+            BetJournal(
+                os.getenv('BET_JOURNAL_DIR', './journal'),
+                ExposureLimits(
+                    max_total=int(os.getenv('DEGRADED_MAX_TOTAL', 50_000_000)),
+                    max_per_user=int(os.getenv('DEGRADED_MAX_PER_USER', 500_000))
+                )
+            ),
+            DatabaseHealth(self.engine),
+            self.redis
+        )
         
         # Create application
-        self.application = Application.builder().token(self.bot_token).build()
+        self.application = (
+            Application.builder()
+            .token(self.bot_token)
+            .post_init(self._start_dispatcher)
+            .post_shutdown(self._stop_dispatcher)
+            .build()
+        )
+        self.application.bot_data['session_factory'] = self.SessionLocal
+        self.application.bot_data['redis'] = self.redis
+        self.application.bot_data['bet_intake'] = self.bet_intake
+        self.application.bot_data['router'] = self.router
+        self.application.bot_data['force_flow_service'] = self.force_flow_service
+        
+        # Outbound announcements are sent from the outbox, never from settlement
+        self.message_dispatcher = MessageDispatcher(
+            self.SessionLocal,
+            self.application.bot,
+            global_rate=float(os.getenv('SEND_GLOBAL_RATE', 25)),
+            per_chat_rate=float(os.getenv('SEND_PER_CHAT_RATE', 1))
+        )
         
         self._setup_handlers()
+        
+        # No-op unless PROFILE_SAMPLE_RATE or PROFILE_SLOW_MS is set
+        self.profiler = UpdateProfiler.from_env()
+        for engine in [self.engine] + self.router.replicas:
+            self.profiler.instrument_engine(engine)
+        self.profiler.instrument_application(self.application)
+
+    async def _start_dispatcher(self, application: Application):
+        self._dispatcher_task = asyncio.create_task(self.message_dispatcher.run())
+        self._recovery_task = asyncio.create_task(self.bet_intake.run_recovery())
+
+    async def _stop_dispatcher(self, application: Application):
+        self.message_dispatcher.stop()
+        await self._dispatcher_task
+        self._recovery_task.cancel()
+        self.bet_intake.journal.close()
 
     def _setup_handlers(self):
+        # Admission control runs first and stops flooded or duplicate commands and bets before any DB work
+        self.flood_control = FloodControl(
+            self.flood_redis,
+            window_seconds=float(os.getenv('FLOOD_WINDOW_SECONDS', 10)),
+            user_limit=int(os.getenv('FLOOD_USER_LIMIT', 10)),
+            chat_limit=int(os.getenv('FLOOD_CHAT_LIMIT', 60))
+        )
+        self.application.add_handler(MessageHandler(ADMISSION_FILTER, self.flood_control), group=-1)
+        
         # Command handlers
         self.application.add_handler(CommandHandler("start", handlers.start))
         self.application.add_handler(CommandHandler("balance", handlers.balance))
@@ -44,6 +149,8 @@ class LotteryBot:
         self.application.add_handler(CommandHandler("commit", handlers.get_commitment))
         self.application.add_handler(CommandHandler("reveal", handlers.reveal_seed))
         self.application.add_handler(CommandHandler("forced_history", handlers.forced_history))
+        self.application.add_handler(CommandHandler("stats", stats_handlers.stats))
+        self.application.add_handler(CommandHandler("top", stats_handlers.top))
         
         # Betting handlers
         self.application.add_handler(MessageHandler(filters.Regex(r'^/N(\d+)$'), handlers.place_bet))
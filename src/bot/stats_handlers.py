@@ -0,0 +1,46 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from ..services.stats_service import StatsService
+
+def _stats_service(context: ContextTypes.DEFAULT_TYPE):
+    db = context.bot_data['session_factory']()
+    return db, StatsService(db, context.bot_data.get('redis'))
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/stats - your totals, read from user_stats in one lookup."""
+    db, stats_service = _stats_service(context)
+    try:
+        user_stats = stats_service.get_user_stats(update.effective_user.id)
+    finally:
+        db.close()
+
+    if not user_stats:
+        await update.message.reply_text("📊 No bets yet.")
+        return
+
+    await update.message.reply_text(
+        f"📊 Bets: {user_stats.bets_count}\n"
+        f"💸 Wagered: {user_stats.wagered}\n"
+        f"🏆 Payouts: {user_stats.payouts_count} ({user_stats.payouts_total})"
+    )
+
+async def top(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/top [won|wagered] [chat] - leaderboard from the Redis sorted sets, or user_stats without Redis."""
+    board = context.args[0] if context.args else 'won'
+    chat_id = update.effective_chat.id if len(context.args) > 1 and context.args[1] == 'chat' else None
+
+    db, stats_service = _stats_service(context)
+    try:
+        entries = await stats_service.top(board, 10, chat_id)
+    except ValueError:
+        await update.message.reply_text("Usage: /top [won|wagered] [chat]")
+        return
+    finally:
+        db.close()
+
+    if not entries:
+        await update.message.reply_text("🏆 Leaderboard is empty.")
+        return
+
+    lines = [f"{rank}. user {user_id}: {score}" for rank, (user_id, score) in enumerate(entries, 1)]
+    await update.message.reply_text(f"🏆 Top {board}\n" + "\n".join(lines))
@@ -0,0 +1,55 @@
+import time
+from typing import Callable
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+class DatabaseHealth:
+    """
+    Circuit breaker for the primary database.
+
+    After `failure_threshold` consecutive failures (errors or calls slower than
+    `slow_seconds`) the database is considered unhealthy and callers should
+    use their degraded path. `probe` checks it again at most every
+    `probe_interval` seconds.
+    """
+
+    def __init__(self, engine: Engine, failure_threshold: int = 3,
+                 slow_seconds: float = 2.0, probe_interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.engine = engine
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.consecutive_failures = 0
+        self.last_probe_at = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures < self.failure_threshold
+
+    def record_success(self, duration: float = 0.0):
+        if duration > self.slow_seconds:
+            self.record_failure()
+        else:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+
+    def probe(self) -> bool:
+        """Run SELECT 1 if the probe interval has passed. Returns current health."""
+        now = self.clock()
+        if self.healthy or now - self.last_probe_at < self.probe_interval:
+            return self.healthy
+        self.last_probe_at = now
+
+        started = self.clock()
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+        except Exception:
+            return False
+        if self.clock() - started <= self.slow_seconds:
+            self.consecutive_failures = 0
+        return self.healthy
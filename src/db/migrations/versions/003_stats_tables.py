@@ -0,0 +1,53 @@
+"""Incrementally maintained statistics
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def _counter_columns():
+    return [
+        sa.Column('bets_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('wagered', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('payouts_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('payouts_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ]
+
+def upgrade():
+    op.create_table('user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        *_counter_columns(),
+        sa.PrimaryKeyConstraint('user_id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+    )
+
+    op.create_table('chat_stats',
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        *_counter_columns(),
+        sa.PrimaryKeyConstraint('chat_id')
+    )
+
+    op.create_table('daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        *_counter_columns(),
+        sa.PrimaryKeyConstraint('day')
+    )
+
+    # Fallback leaderboard queries when Redis is unavailable
+    op.create_index('ix_user_stats_payouts_total', 'user_stats', ['payouts_total'])
+    op.create_index('ix_user_stats_wagered', 'user_stats', ['wagered'])
+
+def downgrade():
+    op.drop_table('daily_stats')
+    op.drop_table('chat_stats')
+    op.drop_table('user_stats')
@@ -0,0 +1,23 @@
+"""Idempotency key for bets replayed from the local journal
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('bets', sa.Column('journal_ref', sa.String(length=36), nullable=True))
+    op.create_unique_constraint('uq_bets_journal_ref', 'bets', ['journal_ref'])
+
+def downgrade():
+    op.drop_constraint('uq_bets_journal_ref', 'bets', type_='unique')
+    op.drop_column('bets', 'journal_ref')
@@ -0,0 +1,27 @@
+"""Per-round client-seed snapshot
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('round_client_seeds',
+        sa.Column('round_id', sa.String(length=255), nullable=False),
+        sa.Column('seeds', sa.JSON(), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('round_id')
+    )
+
+def downgrade():
+    op.drop_table('round_client_seeds')
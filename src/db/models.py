@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, BigInteger, Boolean, DateTime, Float, JSON, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, Date, DateTime, Float, JSON, Text, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import enum
@@ -16,6 +16,11 @@ class PayoutStatus(enum.Enum):
     DONE = "done"
     FAILED = "failed"
 
+class OutboxStatus(enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
 class User(Base):
     __tablename__ = "users"
 
@@ -37,6 +42,7 @@ class Bet(Base):
     bet_type = Column(String(50), nullable=False)  # 'small', 'big', 'even', 'odd', 'specific'
     amount = Column(BigInteger, nullable=False)
     digits = Column(String(6))  # For specific bets
+    journal_ref = Column(String(36), unique=True)  # Set for bets accepted into the local journal
     created_at = Column(DateTime, default=func.now())
 
 class ProvableSeed(Base):
@@ -97,3 +103,54 @@ class Pot(Base):
     id = Column(Integer, primary_key=True)
     balance = Column(BigInteger, default=0)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String(20), default=OutboxStatus.PENDING.value)
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=func.now())  # Not sent before this; also the claim lease
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime)
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    bets_count = Column(Integer, default=0, nullable=False)
+    wagered = Column(BigInteger, default=0, nullable=False)
+    payouts_count = Column(Integer, default=0, nullable=False)
+    payouts_total = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class ChatStats(Base):
+    __tablename__ = "chat_stats"
+
+    chat_id = Column(BigInteger, primary_key=True)
+    bets_count = Column(Integer, default=0, nullable=False)
+    wagered = Column(BigInteger, default=0, nullable=False)
+    payouts_count = Column(Integer, default=0, nullable=False)
+    payouts_total = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class DailyStats(Base):
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    bets_count = Column(Integer, default=0, nullable=False)
+    wagered = Column(BigInteger, default=0, nullable=False)
+    payouts_count = Column(Integer, default=0, nullable=False)
+    payouts_total = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class RoundClientSeeds(Base):
+    __tablename__ = "round_client_seeds"
+
+    round_id = Column(String(255), primary_key=True)
+    seeds = Column(JSON, nullable=False)  # {"<user_id>": "<client_seed>"} frozen at lock time
+    digest = Column(String(64), nullable=False)  # SHA256 of the canonical JSON of seeds
+    created_at = Column(DateTime, default=func.now())
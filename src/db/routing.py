@@ -0,0 +1,114 @@
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Zero when the replica has replayed everything it received, otherwise the age
+# of the last replayed transaction. On a primary (not in recovery) it is zero.
+PG_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+def postgres_lag_probe(engine: Engine) -> float:
+    with engine.connect() as conn:
+        return float(conn.execute(PG_REPLICA_LAG_SQL).scalar())
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions to replica engines.
+
+    A read goes to the primary instead when
+    - the user had a write within the last `ryw_window` seconds (read-your-writes),
+    - every replica lags more than `max_lag_seconds`, or can't be probed.
+    Replica lag is probed at most every `lag_check_interval` seconds per replica.
+    """
+
+    def __init__(self, primary: Engine, replicas: Optional[List[Engine]] = None,
+                 max_lag_seconds: float = 2.0, ryw_window: float = 5.0,
+                 lag_check_interval: float = 1.0,
+                 lag_probe: Callable[[Engine], float] = postgres_lag_probe,
+                 clock: Callable[[], float] = time.monotonic):
+        self.primary = primary
+        self.replicas = replicas or []
+        self.max_lag_seconds = max_lag_seconds
+        self.ryw_window = ryw_window
+        self.lag_check_interval = lag_check_interval
+        self.lag_probe = lag_probe
+        self.clock = clock
+
+        self._sessionmakers = {
+            engine: sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            for engine in [primary] + self.replicas
+        }
+        self._lag: Dict[Engine, Optional[float]] = {}
+        self._lag_checked_at: Dict[Engine, float] = {}
+        self._recent_writes: Dict[int, float] = {}
+        self._round_robin = itertools.cycle(self.replicas) if self.replicas else None
+
+    @classmethod
+    def from_urls(cls, primary_url: str, replica_urls: List[str], **kwargs) -> "ReplicaRouter":
+        return cls(create_engine(primary_url), [create_engine(url) for url in replica_urls], **kwargs)
+
+    def mark_write(self, user_id: int):
+        """Pin this user's reads to the primary until their write has had time to replicate."""
+        now = self.clock()
+        self._recent_writes[user_id] = now + self.ryw_window
+        if len(self._recent_writes) > 10000:
+            self._recent_writes = {
+                key: until for key, until in self._recent_writes.items() if until > now
+            }
+
+    def replica_lag(self, engine: Engine) -> Optional[float]:
+        """Cached replication lag in seconds, or None if the replica can't be reached."""
+        now = self.clock()
+        if now - self._lag_checked_at.get(engine, float('-inf')) >= self.lag_check_interval:
+            self._lag_checked_at[engine] = now
+            try:
+                self._lag[engine] = self.lag_probe(engine)
+            except Exception as e:
+                logger.warning("Replica lag probe failed for %s: %s", engine.url, e)
+                self._lag[engine] = None
+        return self._lag.get(engine)
+
+    def choose_engine(self, user_id: Optional[int] = None) -> Engine:
+        if not self.replicas:
+            return self.primary
+
+        if user_id is not None:
+            until = self._recent_writes.get(user_id)
+            if until is not None and until > self.clock():
+                return self.primary
+
+        for _ in range(len(self.replicas)):
+            engine = next(self._round_robin)
+            lag = self.replica_lag(engine)
+            if lag is not None and lag <= self.max_lag_seconds:
+                return engine
+        return self.primary
+
+    @contextmanager
+    def read_session(self, user_id: Optional[int] = None) -> Iterator[Session]:
+        """Session for read-only work. Never commit through it."""
+        db = self._sessionmakers[self.choose_engine(user_id)]()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def primary_session(self) -> Iterator[Session]:
+        db = self._sessionmakers[self.primary]()
+        try:
+            yield db
+        finally:
+            db.close()
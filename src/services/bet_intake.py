@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from ..db.health import DatabaseHealth
+from ..db.models import User, Bet, ProvableSeed
+from .bet_journal import BetJournal, ExposureLimitExceeded, read_segment
+from .message_dispatcher import enqueue_message
+from .stats_service import StatsService, update_leaderboards
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean "the database is unavailable", as opposed to a rejected bet
+DB_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError)
+
+class BetIntakeService:
+    """
+    Places bets against the database, falling back to the local journal when
+    the database is unhealthy.
+
+    Journaled bets are acknowledged to the player as accepted, within the
+    journal's exposure limits, and applied later by `replay`. Every bet
+    carries a journal_ref so replaying the same entry twice, or replaying an
+    entry whose original DB write actually committed, is a no-op.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], journal: BetJournal,
+                 health: DatabaseHealth, redis=None):
+        self.session_factory = session_factory
+        self.journal = journal
+        self.health = health
+        self.redis = redis
+
+    async def place_bet(self, user_id: int, chat_id: int, round_id: str, bet_type: str,
+                        amount: int, digits: Optional[str] = None) -> Dict:
+        entry = {
+            'ref': str(uuid.uuid4()),
+            'user_id': user_id,
+            'chat_id': chat_id,
+            'round_id': round_id,
+            'bet_type': bet_type,
+            'amount': amount,
+            'digits': digits,
+            'ts': datetime.utcnow().isoformat(),
+        }
+
+        if self.health.healthy or self.health.probe():
+            started = time.monotonic()
+            try:
+                result = self._apply(entry)
+                self.health.record_success(time.monotonic() - started)
+                await self._update_leaderboards(entry, result)
+                return result
+            except DB_UNAVAILABLE_ERRORS as e:
+                logger.warning("Database unavailable, journaling bet %s: %s", entry['ref'], e)
+                self.health.record_failure()
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
+
+        try:
+            await self.journal.append(entry)
+        except ExposureLimitExceeded as e:
+            return {'success': False, 'error': str(e)}
+        return {'success': True, 'degraded': True, 'ref': entry['ref'], 'amount': amount}
+
+    def _apply(self, entry: Dict, check_round_open: bool = False) -> Dict:
+        """Deduct the stake and insert the bet in one transaction."""
+        db = self.session_factory()
+        try:
+            if db.execute(select(Bet.id).where(Bet.journal_ref == entry['ref'])).scalar():
+                return {'success': True, 'degraded': False, 'ref': entry['ref'], 'duplicate': True}
+
+            user = db.execute(
+                select(User).where(User.id == entry['user_id']).with_for_update()
+            ).scalar()
+            if not user:
+                raise ValueError("User not found")
+
+            if check_round_open:
+                revealed_at = db.execute(
+                    select(ProvableSeed.revealed_at).where(ProvableSeed.round_id == entry['round_id'])
+                ).scalar()
+                if revealed_at is not None:
+                    raise ValueError("Round already settled")
+
+            if user.balance < entry['amount']:
+                raise ValueError("Insufficient balance")
+            user.balance -= entry['amount']
+
+            bet = Bet(
+                user_id=entry['user_id'],
+                chat_id=entry['chat_id'],
+                round_id=entry['round_id'],
+                bet_type=entry['bet_type'],
+                amount=entry['amount'],
+                digits=entry['digits'],
+                journal_ref=entry['ref']
+            )
+            db.add(bet)
+
+            StatsService(db).record_bet(entry['user_id'], entry['chat_id'], entry['amount'])
+            db.commit()
+
+            return {
+                'success': True,
+                'degraded': False,
+                'ref': entry['ref'],
+                'bet_id': bet.id,
+                'new_balance': user.balance
+            }
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _update_leaderboards(self, entry: Dict, result: Dict):
+        """Count a committed bet on the Redis leaderboards, once per journal_ref."""
+        if not result.get('duplicate'):
+            await update_leaderboards(self.redis, entry['user_id'], entry['chat_id'], wagered=entry['amount'])
+
+    def _reject(self, entry: Dict, reason: str):
+        """Tell the player a journaled bet could not be applied. Nothing was deducted."""
+        logger.warning("Rejected journaled bet %s: %s", entry['ref'], reason)
+        db = self.session_factory()
+        try:
+            telegram_id = db.execute(
+                select(User.telegram_id).where(User.id == entry['user_id'])
+            ).scalar()
+            if telegram_id is not None:
+                enqueue_message(
+                    db, telegram_id,
+                    f"⚠️ Your bet of {entry['amount']} on round {entry['round_id']} "
+                    f"was not placed: {reason}"
+                )
+                db.commit()
+        finally:
+            db.close()
+
+    async def replay(self) -> Dict[str, int]:
+        """
+        Apply every sealed journal segment to the database, then delete them.
+        If the database fails midway the segments are kept and the next call
+        starts over; entries already applied are skipped by journal_ref.
+        """
+        self.journal.rotate()
+        segments = self.journal.sealed_segments()
+        counts = {'applied': 0, 'duplicate': 0, 'rejected': 0}
+
+        for path in segments:
+            for entry in read_segment(path):
+                try:
+                    result = self._apply(entry, check_round_open=True)
+                except ValueError as e:
+                    self._reject(entry, str(e))
+                    counts['rejected'] += 1
+                    continue
+                counts['duplicate' if result.get('duplicate') else 'applied'] += 1
+                await self._update_leaderboards(entry, result)
+
+        self.journal.discard_segments(segments)
+        logger.info("Journal replay finished: %s", counts)
+        return counts
+
+    async def run_recovery(self, interval: float = 5.0):
+        """
+        Replay the journal whenever it has entries and the database is healthy
+        again. Never raises, so a bad segment or entry doesn't stop recovery;
+        the segments are kept and retried on the next pass.
+        """
+        while True:
+            if self.journal.entries and self.health.probe():
+                try:
+                    await self.replay()
+                except DB_UNAVAILABLE_ERRORS as e:
+                    logger.warning("Journal replay interrupted: %s", e)
+                    self.health.record_failure()
+                except Exception:
+                    logger.exception("Journal replay failed")
+            await asyncio.sleep(interval)
@@ -0,0 +1,213 @@
+"""
+Local write-ahead journal for bet intake while the database is unavailable.
+
+Records are appended to numbered segment files (journal-000001.log, ...) as
+
+    [4-byte big-endian payload length][4-byte big-endian CRC32][JSON payload]
+
+and acknowledged only after an fsync. fsyncs are batched: every append waits
+for the next flush, which runs when `fsync_batch` records are pending or
+`fsync_interval` seconds after the first pending one, whichever comes first.
+
+Stdlib only, so it keeps working when the database driver is what's failing.
+"""
+import asyncio
+import json
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HEADER = struct.Struct('>II')
+SEGMENT_PREFIX = 'journal-'
+SEGMENT_SUFFIX = '.log'
+
+class JournalCorruptError(Exception):
+    pass
+
+class ExposureLimitExceeded(ValueError):
+    pass
+
+class ExposureLimits:
+    """Caps on what may be accepted while bets can't be checked against real balances."""
+
+    def __init__(self, max_total: int = 50_000_000, max_per_user: int = 500_000,
+                 max_entries: int = 100_000):
+        self.max_total = max_total
+        self.max_per_user = max_per_user
+        self.max_entries = max_entries
+
+def encode_record(entry: Dict) -> bytes:
+    payload = json.dumps(entry, separators=(',', ':'), sort_keys=True).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def _segment_number(name: str) -> int:
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+def list_segments(directory: str) -> List[str]:
+    names = [
+        name for name in os.listdir(directory)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    ]
+    return [os.path.join(directory, name) for name in sorted(names, key=_segment_number)]
+
+def read_segment(path: str) -> Iterator[Dict]:
+    """
+    Yield the entries of one segment.
+    A truncated or checksum-failing record at the very end is a torn write that
+    was never acknowledged, and ends the segment. Damage before the end raises.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    offset = 0
+    while offset < len(data):
+        if offset + HEADER.size > len(data):
+            return
+        length, crc = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        end = start + length
+        if end > len(data):
+            return
+        payload = data[start:end]
+        if zlib.crc32(payload) != crc:
+            if end == len(data):
+                return
+            raise JournalCorruptError(f"CRC mismatch in {path} at offset {offset}")
+        yield json.loads(payload)
+        offset = end
+
+def read_journal(directory: str) -> Iterator[Tuple[str, Dict]]:
+    """Yield (segment_path, entry) for every acknowledged record, oldest first."""
+    for path in list_segments(directory):
+        for entry in read_segment(path):
+            yield path, entry
+
+class BetJournal:
+    """
+    Append-only bet journal.
+
+    Every process start opens a fresh segment, so older segments are never
+    written again and a torn tail can only ever be at the end of a segment.
+    Exposure (total and per user) covers every entry still in the journal,
+    including those from before a restart, until `discard_segments` drops them
+    after a successful replay.
+    """
+
+    def __init__(self, directory: str, limits: Optional[ExposureLimits] = None,
+                 segment_max_bytes: int = 16 * 1024 * 1024,
+                 fsync_batch: int = 64, fsync_interval: float = 0.005):
+        self.directory = directory
+        self.limits = limits or ExposureLimits()
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+
+        os.makedirs(directory, exist_ok=True)
+        self.total_exposure = 0
+        self.user_exposure: Dict[int, int] = {}
+        self.entries = 0
+        for _, entry in read_journal(directory):
+            self._track(entry)
+
+        segments = list_segments(directory)
+        self._segment_number = _segment_number(os.path.basename(segments[-1])) if segments else 0
+        self._fd: Optional[int] = None
+        self._segment_size = 0
+        self._pending: List[asyncio.Future] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._open_next_segment()
+
+    @property
+    def current_segment(self) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._segment_number:06d}{SEGMENT_SUFFIX}")
+
+    def _open_next_segment(self):
+        self._segment_number += 1
+        self._fd = os.open(self.current_segment, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._segment_size = 0
+        # Make the new file's directory entry durable too
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _track(self, entry: Dict):
+        amount = int(entry['amount'])
+        user_id = int(entry['user_id'])
+        self.total_exposure += amount
+        self.user_exposure[user_id] = self.user_exposure.get(user_id, 0) + amount
+        self.entries += 1
+
+    def check_limits(self, user_id: int, amount: int):
+        if self.entries + 1 > self.limits.max_entries:
+            raise ExposureLimitExceeded("Journal is full")
+        if self.total_exposure + amount > self.limits.max_total:
+            raise ExposureLimitExceeded("Total degraded-mode exposure limit reached")
+        if self.user_exposure.get(user_id, 0) + amount > self.limits.max_per_user:
+            raise ExposureLimitExceeded("Per-user degraded-mode exposure limit reached")
+
+    async def append(self, entry: Dict):
+        """Append an entry and return once it is fsynced."""
+        self.check_limits(int(entry['user_id']), int(entry['amount']))
+
+        record = encode_record(entry)
+        if self._segment_size and self._segment_size + len(record) > self.segment_max_bytes:
+            self.flush()
+            os.close(self._fd)
+            self._open_next_segment()
+
+        os.write(self._fd, record)
+        self._segment_size += len(record)
+        self._track(entry)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        if len(self._pending) >= self.fsync_batch:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.fsync_interval, self.flush)
+        await future
+
+    def flush(self):
+        """fsync the current segment and acknowledge every pending append."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending, self._pending = self._pending, []
+        try:
+            os.fsync(self._fd)
+        except OSError as e:
+            for future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    def sealed_segments(self) -> List[str]:
+        """Segments that will never be appended to again."""
+        return [path for path in list_segments(self.directory) if path != self.current_segment]
+
+    def rotate(self):
+        """Seal the current segment so everything written so far can be replayed and discarded."""
+        self.flush()
+        os.close(self._fd)
+        self._open_next_segment()
+
+    def discard_segments(self, paths: List[str]):
+        """Delete replayed segments and recompute exposure from what is left."""
+        for path in paths:
+            os.remove(path)
+        self.total_exposure = 0
+        self.user_exposure = {}
+        self.entries = 0
+        for _, entry in read_journal(self.directory):
+            self._track(entry)
+
+    def close(self):
+        self.flush()
+        os.close(self._fd)
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+from telegram.error import RetryAfter, TelegramError
+from ..db.models import OutboxMessage, OutboxStatus
+from ..utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n"
+TRUNCATION_MARKER = "…"
+
+def enqueue_message(db: Session, chat_id: int, text: str) -> OutboxMessage:
+    """
+    Queue a message for the dispatcher.
+    Does not commit: call it inside the settlement transaction so the
+    announcement is stored if and only if the settlement is.
+    """
+    message = OutboxMessage(
+        chat_id=chat_id,
+        text=text,
+        status=OutboxStatus.PENDING.value,
+        attempts=0
+    )
+    db.add(message)
+    return message
+
+def coalesce(messages: List[OutboxMessage],
+             max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> List[Tuple[List[OutboxMessage], str]]:
+    """
+    Group one chat's messages, in order, into as few sends as fit Telegram's
+    length limit. Returns (messages, text) per send. A single message longer
+    than the limit is truncated, since Telegram would reject it on every retry.
+    """
+    groups = []
+    current = []
+    length = 0
+
+    for message in messages:
+        added = len(message.text) + (len(MESSAGE_SEPARATOR) if current else 0)
+        if current and length + added > max_length:
+            groups.append(current)
+            current, length = [], 0
+            added = len(message.text)
+        current.append(message)
+        length += added
+
+    if current:
+        groups.append(current)
+
+    sends = []
+    for group in groups:
+        text = MESSAGE_SEPARATOR.join(message.text for message in group)
+        if len(text) > max_length:
+            logger.warning("Truncating outbox message %s from %d characters", group[0].id, len(text))
+            text = text[:max_length - len(TRUNCATION_MARKER)] + TRUNCATION_MARKER
+        sends.append((group, text))
+    return sends
+
+class MessageDispatcher:
+    """
+    Drains outbox_messages to Telegram.
+
+    Messages are claimed by pushing available_at forward by a lease, sent, and
+    only then marked sent, so a crash mid-send re-delivers rather than loses
+    them. Sends are limited by a global and a per-chat token bucket, and a 429
+    pauses the chat for the retry_after Telegram asks for. Messages claimed
+    for a paused chat are rescheduled rather than waited on, so one chat's
+    pause never delays the rest of a batch.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], bot,
+                 global_rate: float = 25, per_chat_rate: float = 1,
+                 batch_size: int = 200, lease_seconds: int = 60,
+                 max_attempts: int = 5, poll_interval: float = 0.5):
+        self.session_factory = session_factory
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._stopped = asyncio.Event()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_idle()
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate)
+        return bucket
+
+    def _claim(self, db: Session) -> List[OutboxMessage]:
+        now = db.execute(select(func.now())).scalar()
+        messages = db.execute(
+            select(OutboxMessage).where(
+                OutboxMessage.status == OutboxStatus.PENDING.value,
+                OutboxMessage.available_at <= now
+            ).order_by(OutboxMessage.id).limit(self.batch_size).with_for_update(skip_locked=True)
+        ).scalars().all()
+
+        for message in messages:
+            message.available_at = now + timedelta(seconds=self.lease_seconds)
+            message.attempts += 1
+        db.commit()
+        return messages
+
+    async def _send_chat(self, chat_id: int, messages: List[OutboxMessage], results: Dict):
+        bucket = self._chat_bucket(chat_id)
+
+        for group, text in coalesce(messages):
+            ids = [message.id for message in group]
+            paused = bucket.paused_for()
+            if paused > 0:
+                # Don't hold up the batch for a chat still inside a 429 window
+                remaining = [message.id for message in messages if message.id >= ids[0]]
+                results['retry'].append((remaining, paused))
+                return
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                results['sent'].extend(ids)
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) \
+                    else float(e.retry_after)
+                logger.warning("Rate limited in chat %s, retrying after %ss", chat_id, retry_after)
+                bucket.pause(retry_after)
+                # Keep this chat's remaining messages behind the retry window, in order
+                remaining = [message.id for message in messages if message.id >= ids[0]]
+                results['retry'].append((remaining, retry_after))
+                return
+            except TelegramError as e:
+                logger.warning("Failed to send to chat %s: %s", chat_id, e)
+                for message in group:
+                    results['failed'].append((message.id, message.attempts, str(e)))
+
+    async def dispatch_once(self) -> int:
+        """Claim a batch, send it and record the outcome. Returns the number of messages claimed."""
+        db = self.session_factory()
+        try:
+            messages = self._claim(db)
+            if not messages:
+                return 0
+
+            by_chat: Dict[int, List[OutboxMessage]] = {}
+            for message in messages:
+                by_chat.setdefault(message.chat_id, []).append(message)
+
+            results = {'sent': [], 'retry': [], 'failed': []}
+            await asyncio.gather(*(
+                self._send_chat(chat_id, chat_messages, results)
+                for chat_id, chat_messages in by_chat.items()
+            ))
+
+            now = db.execute(select(func.now())).scalar()
+            if results['sent']:
+                db.execute(
+                    update(OutboxMessage).where(OutboxMessage.id.in_(results['sent']))
+                    .values(status=OutboxStatus.SENT.value, sent_at=now, last_error=None)
+                )
+            for ids, retry_after in results['retry']:
+                # A 429 is not the message's fault, so it doesn't count as an attempt
+                db.execute(
+                    update(OutboxMessage).where(OutboxMessage.id.in_(ids)).values(
+                        available_at=now + timedelta(seconds=retry_after),
+                        attempts=OutboxMessage.attempts - 1
+                    )
+                )
+            for message_id, attempts, error in results['failed']:
+                if attempts >= self.max_attempts:
+                    values = {'status': OutboxStatus.FAILED.value, 'last_error': error}
+                else:
+                    values = {'available_at': now + timedelta(seconds=2 ** attempts), 'last_error': error}
+                db.execute(update(OutboxMessage).where(OutboxMessage.id == message_id).values(**values))
+            db.commit()
+            return len(messages)
+        finally:
+            db.close()
+
+    async def run(self):
+        """Dispatch until stop() is called. Never raises, so a DB hiccup doesn't kill the task."""
+        while not self._stopped.is_set():
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                claimed = 0
+
+            if not claimed:
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopped.set()
@@ -1,30 +1,42 @@
 import uuid
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from ..db.models import User, Payout, PayoutStatus, AuditLog, Pot
 from ..utils.locks import user_lock
+from .message_dispatcher import enqueue_message
+from .stats_service import StatsService
+from ..db.routing import ReplicaRouter
+from ..utils.profiling import span, annotate
 
 class PayoutService:
-    def __init__(self, db: Session, house_rate: float = 0.03):
+    def __init__(self, db: Session, house_rate: float = 0.03,
+                 stats_service: Optional[StatsService] = None,
+                 router: Optional[ReplicaRouter] = None):
         self.db = db
         self.house_rate = house_rate
+        self.stats_service = stats_service
+        self.router = router
 
     @user_lock
     async def process_payout(self, user_id: int, amount: int, 
                            round_id: Optional[str] = None, 
-                           reason: str = "win") -> Dict[str, Any]:
+                           reason: str = "win", notify: bool = True,
+                           chat_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Process a payout transaction atomically.
         Uses database transaction and row locking to prevent double spending.
+        The user's notification goes to the outbox in the same transaction.
         """
         tx_ref = str(uuid.uuid4())
+        annotate(round_id=round_id, payout_user_id=user_id)
         
         try:
             # Start transaction
-            user = self.db.execute(
-                select(User).where(User.id == user_id).with_for_update()
-            ).scalar_one()
+            with span('row_lock'):
+                user = self.db.execute(
+                    select(User).where(User.id == user_id).with_for_update()
+                ).scalar_one()
             
             # Create payout record
             payout = Payout(
@@ -51,7 +63,7 @@ class PayoutService:
             
             # Update payout status
             payout.status = PayoutStatus.DONE.value
-            payout.completed_at = self.db.execute('SELECT NOW()').scalar()
+            payout.completed_at = self.db.execute(select(func.now())).scalar()
             
             # Create audit log
             audit_log = AuditLog(
@@ -69,8 +81,25 @@ class PayoutService:
             )
             self.db.add(audit_log)
             
+            if self.stats_service:
+                if chat_id is None and round_id is not None:
+                    chat_id = self.stats_service.round_chat_id(round_id)
+                self.stats_service.record_payout(user_id, amount, chat_id)
+            
+            if notify:
+                enqueue_message(
+                    self.db, user.telegram_id,
+                    f"💰 Payout {amount} for round {round_id}. New balance: {new_balance}"
+                )
+            
             self.db.commit()
             
+            if self.router:
+                self.router.mark_write(user_id)
+            
+            if self.stats_service:
+                await self.stats_service.update_leaderboards(user_id, chat_id, won=amount)
+            
             return {
                 'success': True,
                 'tx_ref': tx_ref,
@@ -103,7 +132,7 @@ class PayoutService:
             self.db.add(pot)
         
         pot.balance += amount
-        pot.updated_at = self.db.execute('SELECT NOW()').scalar()
+        pot.updated_at = self.db.execute(select(func.now())).scalar()
 
     async def retry_failed_payouts(self, max_attempts: int = 3):
         """Retry failed payouts with exponential backoff."""
@@ -119,7 +148,8 @@ class PayoutService:
                 payout.user_id, 
                 payout.amount, 
                 payout.round_id,
-                "retry"
+                "retry",
+                notify=False
             )
             
             if not result['success']:
@@ -127,14 +157,18 @@ class PayoutService:
                 payout.last_error = result['error']
             else:
                 payout.status = PayoutStatus.DONE.value
-                payout.completed_at = self.db.execute('SELECT NOW()').scalar()
+                payout.completed_at = self.db.execute(select(func.now())).scalar()
             
             self.db.commit()
 
     def get_payout_history(self, user_id: int, limit: int = 10):
-        """Get payout history for a user."""
-        return self.db.execute(
-            select(Payout).where(
-                Payout.user_id == user_id
-            ).order_by(Payout.created_at.desc()).limit(limit)
-        ).scalars().all()
+        """Get payout history for a user, from a replica when one is fresh enough."""
+        query = select(Payout).where(
+            Payout.user_id == user_id
+        ).order_by(Payout.created_at.desc()).limit(limit)
+        
+        if not self.router:
+            return self.db.execute(query).scalars().all()
+        
+        with self.router.read_session(user_id) as db:
+            return db.execute(query).scalars().all()
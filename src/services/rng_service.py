@@ -1,21 +1,23 @@
-import hashlib
-import hmac
 import secrets
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import os
 from ..utils.crypto import encrypt_seed, decrypt_seed
-from ..utils.convert import bytes_to_digits_unbiased
+from .. import verifier
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from ..db.models import ProvableSeed
+from ..db.models import ProvableSeed, RoundClientSeeds, User, Bet
+from ..db.routing import ReplicaRouter
+from ..utils.profiling import span
 
 class RNGService:
-    def __init__(self, encryption_key: str):
+    def __init__(self, encryption_key: str, router: Optional[ReplicaRouter] = None):
         self.encryption_key = encryption_key
+        self.router = router
 
     def generate_server_seed(self) -> Tuple[str, str]:
         """Generate a cryptographically secure server seed and its commitment."""
         server_seed = secrets.token_hex(32)  # 256-bit entropy
-        commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+        commitment = verifier.commitment_for(server_seed)
         return server_seed, commitment
 
     def encrypt_and_store_seed(self, db: Session, round_id: str, server_seed: str, 
@@ -39,43 +41,40 @@ class RNGService:
                       client_seed: Optional[str] = None) -> List[int]:
         """
         Compute 6 digits using HMAC-SHA256 with rejection sampling to avoid bias.
+        The derivation lives in src.verifier so external verifiers run the same code.
         """
-        # Prepare the message: round_id + client_seed (if provided)
-        message = round_id.encode()
-        if client_seed:
-            message += client_seed.encode()
-
-        # Use server_seed as HMAC key
-        hmac_key = server_seed.encode()
-        
-        digits = []
-        counter = 0
-        
-        while len(digits) < 6:
-            # Generate HMAC with counter to get more bytes if needed
-            hmac_msg = message + counter.to_bytes(4, 'big')
-            mac = hmac.new(hmac_key, hmac_msg, hashlib.sha256).digest()
-            
-            # Process each byte in the MAC
-            for byte in mac:
-                if len(digits) >= 6:
-                    break
-                    
-                # Rejection sampling: only accept bytes 0-249 for uniform distribution
-                if byte < 250:
-                    digit = byte % 10
-                    digits.append(digit)
-            
-            counter += 1
-        
-        return digits
+        with span('rng'):
+            return verifier.compute_digits(server_seed, round_id, client_seed)
 
     def get_seed_for_round(self, db: Session, round_id: str) -> Optional[ProvableSeed]:
         """Retrieve seed record for a round."""
         return db.query(ProvableSeed).filter(ProvableSeed.round_id == round_id).first()
 
+    def find_seed_for_round(self, round_id: str) -> Optional[ProvableSeed]:
+        """
+        Retrieve a round's seed record, preferring a replica for revealed rounds.
+        Revealed records never change, so any replica that has the row is
+        correct. Otherwise the primary's row is returned as is: pending, just
+        revealed, or None for an unknown round. At most one query each.
+        Needs a router; raises RuntimeError without one.
+        """
+        if not self.router:
+            raise RuntimeError("find_seed_for_round needs a ReplicaRouter")
+        
+        with self.router.read_session() as db:
+            seed_record = self.get_seed_for_round(db, round_id)
+        if seed_record is not None and seed_record.revealed_at is not None:
+            return seed_record
+        
+        with self.router.primary_session() as db:
+            return self.get_seed_for_round(db, round_id)
+
     def reveal_seed(self, db: Session, round_id: str) -> Optional[str]:
-        """Reveal the server seed for a round."""
+        """
+        Reveal the server seed for a round. The round's client seeds are
+        frozen first if lock time didn't already, so every revealed round is
+        published with the snapshot its digits are verified against.
+        """
         seed_record = self.get_seed_for_round(db, round_id)
         if not seed_record:
             return None
@@ -87,26 +86,69 @@ class RNGService:
             
         # Decrypt and verify
         server_seed = decrypt_seed(seed_record.encrypted_seed, self.encryption_key)
-        computed_commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+        computed_commitment = verifier.commitment_for(server_seed)
         
         if computed_commitment != seed_record.commitment:
             raise ValueError("Commitment verification failed!")
+        
+        self.snapshot_client_seeds(db, round_id)
             
         # Update record
-        seed_record.revealed_at = db.execute('SELECT NOW()').scalar()
-        seed_record.revealed_seed_hash = hashlib.sha256(server_seed.encode()).hexdigest()
+        seed_record.revealed_at = db.execute(select(func.now())).scalar()
+        seed_record.revealed_seed_hash = verifier.commitment_for(server_seed)
         db.commit()
         
         return server_seed
 
+    def snapshot_client_seeds(self, db: Session, round_id: str) -> RoundClientSeeds:
+        """
+        Freeze the client seeds of everyone who bet in a round. Call at lock time.
+        One bulk read over bets joined to users; later /setclientseed changes
+        don't affect the round. Idempotent: an existing snapshot is returned as is.
+        """
+        snapshot = db.get(RoundClientSeeds, round_id)
+        if snapshot is not None:
+            return snapshot
+        
+        seed_record = self.get_seed_for_round(db, round_id)
+        seeds = {}
+        if seed_record is None or seed_record.client_seed_allowed:
+            rows = db.execute(
+                select(User.id, User.client_seed).distinct()
+                .join(Bet, Bet.user_id == User.id)
+                .where(Bet.round_id == round_id, User.client_seed.isnot(None))
+            )
+            seeds = {str(user_id): client_seed for user_id, client_seed in rows}
+        
+        snapshot = RoundClientSeeds(
+            round_id=round_id,
+            seeds=seeds,
+            digest=verifier.client_seeds_digest(seeds)
+        )
+        db.add(snapshot)
+        db.commit()
+        return snapshot
+
+    def get_client_seed_snapshot(self, db: Session, round_id: str) -> Dict[str, str]:
+        """A round's frozen client seeds keyed by str(user_id); empty if none were taken."""
+        snapshot = db.get(RoundClientSeeds, round_id)
+        return snapshot.seeds if snapshot is not None else {}
+
     def verify_round(self, server_seed: str, round_id: str, 
                     client_seed: Optional[str] = None, 
-                    expected_digits: Optional[List[int]] = None) -> Tuple[bool, List[int], str]:
+                    expected_digits: Optional[List[int]] = None,
+                    client_seeds: Optional[Dict[str, str]] = None,
+                    user_id: Optional[int] = None) -> Tuple[bool, List[int], str]:
         """
         Verify a round's results.
+        Pass the round's client_seeds snapshot and user_id instead of client_seed
+        to verify with the seed that was in effect when the round locked.
         Returns (is_valid, computed_digits, computed_commitment)
         """
-        computed_commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+        if client_seed is None and client_seeds is not None and user_id is not None:
+            client_seed = client_seeds.get(str(user_id))
+        
+        computed_commitment = verifier.commitment_for(server_seed)
         computed_digits = self.compute_digits(server_seed, round_id, client_seed)
         
         if expected_digits:
@@ -131,16 +173,16 @@ class RNGService:
             
             # Check if this seed produces the forced outcome
             if forced_value == 'small' and last_digit in [0, 1, 2, 3, 4]:
-                commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+                commitment = verifier.commitment_for(server_seed)
                 return server_seed, commitment
             elif forced_value == 'big' and last_digit in [5, 6, 7, 8, 9]:
-                commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+                commitment = verifier.commitment_for(server_seed)
                 return server_seed, commitment
             elif forced_value == 'even' and last_digit % 2 == 0:
-                commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+                commitment = verifier.commitment_for(server_seed)
                 return server_seed, commitment
             elif forced_value == 'odd' and last_digit % 2 == 1:
-                commitment = hashlib.sha256(server_seed.encode()).hexdigest()
+                commitment = verifier.commitment_for(server_seed)
                 return server_seed, commitment
                 
             attempts += 1
@@ -0,0 +1,130 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..db.models import User, Bet, UserStats, ChatStats, DailyStats
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARDS = ('won', 'wagered')
+
+def leaderboard_key(board: str, chat_id: Optional[int] = None) -> str:
+    if chat_id is None:
+        return f"lb:{board}"
+    return f"lb:chat:{chat_id}:{board}"
+
+async def update_leaderboards(redis, user_id: int, chat_id: Optional[int] = None,
+                              wagered: int = 0, won: int = 0):
+    """
+    Bump the Redis leaderboards with an async client. Errors, including the
+    client's timeouts, are logged and dropped so a slow Redis never holds up
+    a bet or payout.
+    """
+    if redis is None:
+        return
+
+    pipe = redis.pipeline(transaction=False)
+    for board, amount in (('wagered', wagered), ('won', won)):
+        if not amount:
+            continue
+        pipe.zincrby(leaderboard_key(board), amount, user_id)
+        if chat_id is not None:
+            pipe.zincrby(leaderboard_key(board, chat_id), amount, user_id)
+    try:
+        await pipe.execute()
+    except (RedisError, OSError) as e:
+        # The committed SQL aggregates stay authoritative; a rebuild resyncs Redis
+        logger.warning("Leaderboard update failed for user %s: %s", user_id, e)
+
+class StatsService:
+    """
+    Per-user, per-chat and per-day aggregates kept up to date as bets are
+    placed and payouts settle, so stats commands never scan bets/payouts.
+
+    record_bet/record_payout only add upserts to the caller's transaction.
+    Await update_leaderboards after that transaction commits; the Redis sorted
+    sets are a cache that tools/rebuild_stats.py can always regenerate. `redis`
+    is an async client (redis.asyncio) with socket timeouts set.
+    """
+
+    def __init__(self, db: Session, redis=None):
+        self.db = db
+        self.redis = redis
+
+    def _upsert(self, model, key: Dict, increments: Dict[str, int]):
+        table = model.__table__
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+
+        stmt = insert(table).values(**key, **increments, updated_at=func.now())
+        set_ = {column: table.c[column] + stmt.excluded[column] for column in increments}
+        set_['updated_at'] = func.now()
+        self.db.execute(stmt.on_conflict_do_update(index_elements=list(key), set_=set_))
+
+    def record_bet(self, user_id: int, chat_id: int, amount: int):
+        """Count a placed bet. Runs inside the caller's transaction."""
+        increments = {'bets_count': 1, 'wagered': amount}
+        self._upsert(UserStats, {'user_id': user_id}, increments)
+        self._upsert(ChatStats, {'chat_id': chat_id}, increments)
+        self._upsert(DailyStats, {'day': func.current_date()}, increments)
+
+    def round_chat_id(self, round_id: str) -> Optional[int]:
+        """
+        The chat a round's payouts are counted under. Payouts carry no chat_id,
+        so this is the lowest chat_id among the round's bets, the same rule
+        tools/rebuild_stats.py applies.
+        """
+        return self.db.execute(select(func.min(Bet.chat_id)).where(Bet.round_id == round_id)).scalar()
+
+    def record_payout(self, user_id: int, amount: int, chat_id: Optional[int] = None):
+        """Count a settled payout. Runs inside the caller's transaction."""
+        increments = {'payouts_count': 1, 'payouts_total': amount}
+        self._upsert(UserStats, {'user_id': user_id}, increments)
+        if chat_id is not None:
+            self._upsert(ChatStats, {'chat_id': chat_id}, increments)
+        self._upsert(DailyStats, {'day': func.current_date()}, increments)
+
+    async def update_leaderboards(self, user_id: int, chat_id: Optional[int] = None,
+                                  wagered: int = 0, won: int = 0):
+        """Bump the Redis leaderboards after the stats transaction has committed."""
+        await update_leaderboards(self.redis, user_id, chat_id, wagered, won)
+
+    def get_user_stats(self, telegram_id: int) -> Optional[UserStats]:
+        return self.db.execute(
+            select(UserStats).join(User, User.id == UserStats.user_id)
+            .where(User.telegram_id == telegram_id)
+        ).scalar()
+
+    def get_chat_stats(self, chat_id: int) -> Optional[ChatStats]:
+        return self.db.get(ChatStats, chat_id)
+
+    def get_daily_stats(self, day) -> Optional[DailyStats]:
+        return self.db.get(DailyStats, day)
+
+    async def top(self, board: str = 'won', limit: int = 10,
+                  chat_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Top users as (user_id, score). Global boards fall back to the indexed
+        user_stats columns when Redis is unavailable; per-chat boards only
+        live in Redis and come back empty then.
+        """
+        if board not in LEADERBOARDS:
+            raise ValueError("Invalid leaderboard")
+
+        if self.redis is not None:
+            try:
+                entries = await self.redis.zrevrange(leaderboard_key(board, chat_id), 0, limit - 1, withscores=True)
+                return [(int(member), int(score)) for member, score in entries]
+            except (RedisError, OSError) as e:
+                logger.warning("Leaderboard read failed, using user_stats: %s", e)
+
+        if chat_id is not None:
+            return []
+        column = UserStats.payouts_total if board == 'won' else UserStats.wagered
+        return [
+            (user_id, score) for user_id, score in self.db.execute(
+                select(UserStats.user_id, column).order_by(column.desc()).limit(limit)
+            )
+        ]
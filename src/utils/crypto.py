@@ -1,13 +1,22 @@
 import base64
+import functools
+import hashlib
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import os
+from .profiling import span
 
+SEED_KEY_SALT_PREFIX = b"quick-lottery-seed-key:"
+
+@functools.lru_cache(maxsize=8)
 def derive_key(password: str, salt: bytes = None) -> bytes:
-    """Derive a key from password using PBKDF2."""
+    """
+    Derive a key from password using PBKDF2.
+    Without an explicit salt a fixed one is derived from the password, so
+    encrypt and decrypt get the same key; results are cached per process.
+    """
     if salt is None:
-        salt = os.urandom(16)
+        salt = hashlib.sha256(SEED_KEY_SALT_PREFIX + password.encode()).digest()[:16]
     
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
@@ -15,7 +24,8 @@ def derive_key(password: str, salt: bytes = None) -> bytes:
         salt=salt,
         iterations=100000,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    with span('kdf'):
+        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
     return key
 
 def encrypt_seed(seed: str, encryption_key: str) -> str:
@@ -0,0 +1,35 @@
+import asyncio
+import functools
+from typing import Dict
+from .profiling import span
+
+# Per-user locks for this process. The row lock (SELECT ... FOR UPDATE) is
+# what protects balances across processes; this only keeps one process from
+# interleaving two operations for the same user on one session.
+_user_locks: Dict[int, asyncio.Lock] = {}
+_waiters: Dict[int, int] = {}
+
+def user_lock(func):
+    """
+    Serialize calls of an async method per user. The user id is the first
+    argument after self. Waiting for the lock is traced as a 'user_lock' span.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, user_id: int, *args, **kwargs):
+        lock = _user_locks.setdefault(user_id, asyncio.Lock())
+        _waiters[user_id] = _waiters.get(user_id, 0) + 1
+        try:
+            with span('user_lock'):
+                await lock.acquire()
+            try:
+                return await func(self, user_id, *args, **kwargs)
+            finally:
+                lock.release()
+        finally:
+            _waiters[user_id] -= 1
+            if not _waiters[user_id]:
+                del _waiters[user_id]
+                _user_locks.pop(user_id, None)
+
+    return wrapper
@@ -0,0 +1,315 @@
+"""
+Per-update tracing and slow-update capture for the bot.
+
+    profiler = UpdateProfiler.from_env()
+    profiler.instrument_application(application)
+    profiler.instrument_engine(engine)          # once per engine, replicas included
+
+Each traced update records spans (`with span('rng'): ...`, plus automatic
+'db' spans from the engine hooks). Spans record self-time: a nested span's
+time is taken out of its parent, and statements run inside a named span
+count toward that span rather than 'db', so the totals add up to at most
+the update's duration. A sampled fraction of updates is logged
+with its span breakdown; any update slower than the threshold is dumped to
+disk with its context, a stack snapshot taken while it was still running
+and, if it was also sampled for cProfile, its profile.
+
+When neither sampling nor the slow threshold is configured nothing is
+wrapped or hooked, and `span()` is a context variable lookup returning a
+shared no-op object.
+"""
+import asyncio
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+class UpdateTrace:
+    __slots__ = ('handler', 'context', 'started', 'spans', 'thread_id', 'task', 'stack', 'sampled',
+                 '_children')
+
+    def __init__(self, handler: str, context: Dict, sampled: bool):
+        self.handler = handler
+        self.context = context
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.spans: List[tuple] = []
+        self.thread_id = threading.get_ident()
+        self.task = asyncio.current_task()
+        self.stack: Optional[Dict] = None
+        # Time spent in nested spans, one entry per open span
+        self._children: List[float] = []
+
+    @property
+    def in_span(self) -> bool:
+        return bool(self._children)
+
+    def enter_span(self):
+        self._children.append(0.0)
+
+    def exit_span(self, name: str, started: float):
+        """Record a span opened with enter_span, minus the time of spans nested in it."""
+        duration = time.perf_counter() - started
+        children = self._children.pop()
+        if self._children:
+            self._children[-1] += duration
+        self.add_span(name, started, duration - children)
+
+    def add_span(self, name: str, started: float, duration: float):
+        self.spans.append((name, started - self.started, duration))
+
+    def span_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+_current_trace: ContextVar[Optional[UpdateTrace]] = ContextVar('update_trace', default=None)
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace: UpdateTrace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.trace.enter_span()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.exit_span(self.name, self.started)
+        return False
+
+def span(name: str):
+    """Time a block as part of the current update's trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return _Span(trace, name)
+
+def annotate(**context):
+    """Attach context (e.g. round_id) to the current update's trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.context.update(context)
+
+class UpdateProfiler:
+    def __init__(self, sample_rate: float = 0.0, slow_threshold: Optional[float] = None,
+                 dump_dir: str = './profiles', profile_sampled: bool = False,
+                 watchdog_interval: float = 0.05):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.dump_dir = dump_dir
+        self.profile_sampled = profile_sampled
+        self.watchdog_interval = watchdog_interval
+        self._active: Dict[int, UpdateTrace] = {}
+        self._profiling = False
+        self._watchdog: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "UpdateProfiler":
+        slow_ms = os.getenv('PROFILE_SLOW_MS')
+        return cls(
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+            slow_threshold=float(slow_ms) / 1000 if slow_ms else None,
+            dump_dir=os.getenv('PROFILE_DUMP_DIR', './profiles'),
+            profile_sampled=os.getenv('PROFILE_CPROFILE', 'false').lower() == 'true'
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_threshold is not None
+
+    def instrument_application(self, application):
+        """Wrap the callback of every registered handler."""
+        if not self.enabled:
+            return
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                handler.callback = self.wrap(handler.callback)
+
+    def instrument_engine(self, engine: Engine):
+        """
+        Record statements executed during a traced update as 'db' spans.
+        Statements inside a named span (e.g. the SELECT ... FOR UPDATE in
+        'row_lock') are left to that span so they aren't counted twice.
+        """
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            trace = _current_trace.get()
+            if trace is not None and not trace.in_span:
+                trace.enter_span()
+                conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            trace = _current_trace.get()
+            started = conn.info.get('profiling_started')
+            if trace is not None and started:
+                trace.exit_span('db', started.pop())
+
+        @event.listens_for(engine, 'handle_error')
+        def _error(exception_context):
+            # after_cursor_execute doesn't fire for a failed statement
+            conn = exception_context.connection
+            started = conn.info.get('profiling_started') if conn is not None else None
+            if started:
+                begin = started.pop()
+                trace = _current_trace.get()
+                if trace is not None:
+                    trace.exit_span('db', begin)
+
+    def wrap(self, callback):
+        if not self.enabled:
+            return callback
+
+        handler_name = getattr(callback, '__qualname__', repr(callback))
+
+        @functools.wraps(callback)
+        async def traced(update, context):
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+            if not sampled and self.slow_threshold is None:
+                return await callback(update, context)
+
+            trace = UpdateTrace(handler_name, _update_context(update), sampled)
+            token = _current_trace.set(trace)
+            self._active[id(trace)] = trace
+            self._ensure_watchdog()
+
+            profiler = None
+            if sampled and self.profile_sampled and not self._profiling:
+                # cProfile is per thread, so at most one update is profiled at a
+                # time and the profile includes other tasks run while it awaited
+                self._profiling = True
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                return await callback(update, context)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    self._profiling = False
+                _current_trace.reset(token)
+                self._active.pop(id(trace), None)
+                self._finish(trace, time.perf_counter() - trace.started, profiler)
+
+        return traced
+
+    def _finish(self, trace: UpdateTrace, duration: float, profiler: Optional[cProfile.Profile]):
+        totals = trace.span_totals()
+        if trace.sampled:
+            logger.info(
+                "update %s %.1fms spans=%s context=%s", trace.handler, duration * 1000,
+                {name: round(value * 1000, 2) for name, value in totals.items()}, trace.context
+            )
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            try:
+                self._dump(trace, duration, totals, profiler)
+            except OSError as e:
+                logger.warning("Could not write slow update dump: %s", e)
+
+    def _dump(self, trace: UpdateTrace, duration: float, totals: Dict[str, float],
+              profiler: Optional[cProfile.Profile]):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        base = os.path.join(
+            self.dump_dir,
+            f"slow-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{trace.handler.replace('.', '_')}"
+        )
+
+        report = {
+            'handler': trace.handler,
+            'context': trace.context,
+            'duration_ms': duration * 1000,
+            'span_totals_ms': {name: value * 1000 for name, value in totals.items()},
+            'other_ms': max(0.0, duration - sum(totals.values())) * 1000,
+            'spans': [
+                {'name': name, 'offset_ms': offset * 1000, 'duration_ms': length * 1000}
+                for name, offset, length in trace.spans
+            ],
+            'stack': trace.stack,
+        }
+        if profiler is not None:
+            profiler.dump_stats(base + '.prof')
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(30)
+            report['profile'] = out.getvalue()
+
+        with open(base + '.json', 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        logger.warning("Slow update %s (%.1fms) dumped to %s.json", trace.handler, duration * 1000, base)
+
+    def _ensure_watchdog(self):
+        if self.slow_threshold is None or self._watchdog is not None:
+            return
+        self._watchdog = threading.Thread(target=self._watch, name='update-profiler-watchdog', daemon=True)
+        self._watchdog.start()
+
+    def _watch(self):
+        """Snapshot the stacks of updates still running past the threshold."""
+        while True:
+            time.sleep(self.watchdog_interval)
+            now = time.perf_counter()
+            for trace in list(self._active.values()):
+                if trace.stack is None and now - trace.started >= self.slow_threshold:
+                    trace.stack = _snapshot(trace)
+
+def _update_context(update) -> Dict:
+    context = {}
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        context['chat_id'] = chat.id
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        context['user_id'] = user.id
+    update_id = getattr(update, 'update_id', None)
+    if update_id is not None:
+        context['update_id'] = update_id
+    return context
+
+def _snapshot(trace: UpdateTrace) -> Dict:
+    """
+    The event loop thread's stack shows CPU-bound work blocking the loop;
+    the task's coroutine stack shows where an awaiting update is waiting.
+    """
+    snapshot = {}
+    frame = sys._current_frames().get(trace.thread_id)
+    if frame is not None:
+        snapshot['thread'] = traceback.format_stack(frame)
+    if trace.task is not None:
+        try:
+            out = io.StringIO()
+            trace.task.print_stack(file=out)
+            snapshot['task'] = out.getvalue()
+        except Exception as e:
+            snapshot['task'] = f"unavailable: {e}"
+    return snapshot
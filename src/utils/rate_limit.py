@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to `capacity`.
+    `pause` blocks the bucket entirely, e.g. to honor a server-side retry_after.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available. Returns 0 on success, otherwise seconds to wait."""
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def can_acquire(self, tokens: float = 1) -> bool:
+        """Whether try_acquire would succeed right now, without taking anything."""
+        now = self.clock()
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        return self.tokens >= tokens
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available and take them."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+        # Start refilling from empty once the pause ends
+        self.tokens = 0
+        self.updated_at = self.paused_until
+
+    def paused_for(self) -> float:
+        """Seconds left in the current pause, 0 if not paused."""
+        return max(0.0, self.paused_until - self.clock())
+
+    def is_idle(self) -> bool:
+        """Full and not paused, so it can be dropped and recreated without changing behavior."""
+        now = self.clock()
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        return self.tokens >= self.capacity
@@ -0,0 +1,88 @@
+"""
+Standalone provably-fair verifier.
+
+Stdlib only, so auditors can import it (or run ``python -m src.verifier``)
+without SQLAlchemy, the ORM models or ``cryptography``. ``RNGService`` uses the
+same functions, so the derivation here is the one the bot uses.
+"""
+import hashlib
+import hmac
+import json
+from typing import Dict, List, Optional
+
+NUM_DIGITS = 6
+
+
+def commitment_for(server_seed: str) -> str:
+    """SHA256 commitment published before a round."""
+    return hashlib.sha256(server_seed.encode()).hexdigest()
+
+
+def client_seeds_digest(seeds: Dict[str, str]) -> str:
+    """SHA256 of a round's client-seed snapshot, as published with the round."""
+    canonical = json.dumps(seeds, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def compute_digits(server_seed: str, round_id: str,
+                   client_seed: Optional[str] = None,
+                   num_digits: int = NUM_DIGITS) -> List[int]:
+    """
+    Compute digits using HMAC-SHA256 with rejection sampling to avoid bias.
+    The server seed is the HMAC key, the message is round_id + client_seed +
+    a 4-byte big-endian counter.
+    """
+    message = round_id.encode()
+    if client_seed:
+        message += client_seed.encode()
+    key = server_seed.encode()
+
+    digits = []
+    counter = 0
+
+    while len(digits) < num_digits:
+        mac = hmac.digest(key, message + counter.to_bytes(4, 'big'), 'sha256')
+        for byte in mac:
+            # Rejection sampling: only accept bytes 0-249 for uniform distribution
+            if byte < 250:
+                digits.append(byte % 10)
+                if len(digits) >= num_digits:
+                    break
+        counter += 1
+
+    return digits
+
+
+def outcome(digits: List[int]) -> Dict[str, str]:
+    """Size and parity of the last digit."""
+    last_digit = digits[-1]
+    return {
+        'size': 'small' if last_digit < 5 else 'big',
+        'parity': 'even' if last_digit % 2 == 0 else 'odd',
+    }
+
+
+def verify(round_id: str, server_seed: str, commitment: Optional[str] = None,
+           client_seed: Optional[str] = None,
+           expected_digits: Optional[List[int]] = None) -> Dict:
+    """
+    Verify a revealed round.
+    Checks the commitment (if given) and the digits (if given) and returns
+    the recomputed values.
+    """
+    computed_commitment = commitment_for(server_seed)
+    digits = compute_digits(server_seed, round_id, client_seed)
+
+    commitment_ok = commitment is None or computed_commitment == commitment.lower()
+    digits_ok = expected_digits is None or list(expected_digits) == digits
+
+    result = {
+        'ok': commitment_ok and digits_ok,
+        'round_id': round_id,
+        'commitment': computed_commitment,
+        'commitment_ok': commitment_ok,
+        'digits': digits,
+        'digits_ok': digits_ok,
+    }
+    result.update(outcome(digits))
+    return result
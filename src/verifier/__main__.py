@@ -0,0 +1,91 @@
+"""
+Command line entry point for the standalone verifier.
+
+One-shot:
+    python -m src.verifier <round_id> <revealed_seed> [published_commitment] [client_seed]
+
+Server mode, one JSON request per line on stdin and one JSON result per line
+on stdout, so repeated verifications don't pay interpreter startup:
+    python -m src.verifier --serve < rounds.jsonl
+
+Each request is an object with round_id and server_seed, and optionally
+commitment, client_seed, expected_digits and id (echoed back). Instead of
+client_seed a request can carry a round's client_seeds snapshot (as exported
+by the API) plus user_id; client_seeds_digest, if given, is checked too.
+"""
+import json
+import sys
+from typing import IO
+
+from . import client_seeds_digest, verify
+
+
+def _expected_digits(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [int(c) for c in value]
+    return [int(d) for d in value]
+
+
+def handle_request(request: dict) -> dict:
+    """Verify a single decoded JSONL request."""
+    client_seed = request.get('client_seed')
+    snapshot = request.get('client_seeds')
+    if client_seed is None and snapshot is not None and 'user_id' in request:
+        client_seed = snapshot.get(str(request['user_id']))
+
+    result = verify(
+        request['round_id'],
+        request['server_seed'],
+        commitment=request.get('commitment'),
+        client_seed=client_seed,
+        expected_digits=_expected_digits(request.get('expected_digits')),
+    )
+    if snapshot is not None and 'client_seeds_digest' in request:
+        result['client_seeds_ok'] = client_seeds_digest(snapshot) == request['client_seeds_digest']
+        result['ok'] = result['ok'] and result['client_seeds_ok']
+    if 'id' in request:
+        result['id'] = request['id']
+    return result
+
+
+def serve(stdin: IO[str], stdout: IO[str]) -> int:
+    """Process JSONL requests until EOF. Returns the number of failed lines."""
+    failures = 0
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            result = handle_request(json.loads(line))
+        except Exception as e:
+            result = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        if not result['ok']:
+            failures += 1
+        stdout.write(json.dumps(result, separators=(',', ':')) + '\n')
+        stdout.flush()
+    return failures
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv and argv[0] == '--serve':
+        serve(sys.stdin, sys.stdout)
+        return 0
+
+    if len(argv) < 2:
+        print("Usage: python -m src.verifier <round_id> <revealed_seed> [published_commitment] [client_seed]")
+        print("       python -m src.verifier --serve < requests.jsonl")
+        return 2
+
+    result = verify(argv[0], argv[1],
+                    commitment=argv[2] if len(argv) > 2 else None,
+                    client_seed=argv[3] if len(argv) > 3 else None)
+    print(json.dumps(result))
+    return 0 if result['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import json
+from datetime import date, datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from src.api import main as api
+from src.db.models import Base, User, Bet, ProvableSeed
+from src.db.routing import ReplicaRouter
+from src.services.rng_service import RNGService
+from src import verifier
+
+SERVER_SEED = "d" * 64
+
+class TestVerificationAPI:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, monkeypatch):
+        engine = self.engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+        Base.metadata.create_all(engine)
+        self.router = ReplicaRouter(engine)
+        self.rng_service = RNGService("test-encryption-key", self.router)
+
+        monkeypatch.setattr(api, 'router', self.router)
+        monkeypatch.setattr(api, 'rng_service', self.rng_service)
+        monkeypatch.setattr(api, 'revealed_cache', api.RevealedRoundCache())
+
+        with Session(engine) as db:
+            db.add(User(id=1, telegram_id=101, client_seed="player_seed"))
+            db.add(Bet(user_id=1, chat_id=10, round_id="r_revealed", bet_type="big", amount=1000))
+            self.rng_service.encrypt_and_store_seed(
+                db, "r_revealed", SERVER_SEED, verifier.commitment_for(SERVER_SEED), "p1"
+            )
+            self.rng_service.encrypt_and_store_seed(
+                db, "r_pending", "e" * 64, verifier.commitment_for("e" * 64), "p1"
+            )
+            self.rng_service.reveal_seed(db, "r_revealed")
+
+    def _add_revealed(self, round_id, snapshot=False):
+        with Session(self.engine) as db:
+            self.rng_service.encrypt_and_store_seed(
+                db, round_id, SERVER_SEED, verifier.commitment_for(SERVER_SEED)
+            )
+            if snapshot:
+                self.rng_service.reveal_seed(db, round_id)
+            else:
+                db.query(ProvableSeed).filter_by(round_id=round_id).one().revealed_at = datetime(2024, 1, 1)
+                db.commit()
+
+    def test_revealed_round(self):
+        with TestClient(api.app) as client:
+            response = client.get("/rounds/r_revealed")
+
+        assert response.status_code == 200
+        assert response.headers['cache-control'] == api.IMMUTABLE_CACHE_CONTROL
+        body = response.json()
+        assert body['status'] == 'revealed'
+        assert body['server_seed'] == SERVER_SEED
+        assert body['digits'] == verifier.compute_digits(SERVER_SEED, "r_revealed")
+        assert body['client_seeds'] == {"1": "player_seed"}
+        assert body['client_seeds_digest'] == verifier.client_seeds_digest({"1": "player_seed"})
+
+    def test_pending_round_hides_seed(self):
+        with TestClient(api.app) as client:
+            response = client.get("/rounds/r_pending")
+
+        assert response.status_code == 200
+        assert response.headers['cache-control'] == api.PENDING_CACHE_CONTROL
+        assert response.json()['status'] == 'pending'
+        assert 'server_seed' not in response.json()
+
+    def test_unknown_round(self):
+        with TestClient(api.app) as client:
+            assert client.get("/rounds/missing").status_code == 404
+
+    def test_etag_not_modified(self):
+        with TestClient(api.app) as client:
+            etag = client.get("/rounds/r_revealed").headers['etag']
+            response = client.get("/rounds/r_revealed", headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert response.content == b''
+
+    def test_period(self):
+        with TestClient(api.app) as client:
+            response = client.get("/periods/p1")
+
+        assert response.status_code == 200
+        # Still has a pending round, so it may change
+        assert response.headers['cache-control'] == api.PENDING_CACHE_CONTROL
+        statuses = [entry['status'] for entry in response.json()['rounds']]
+        assert statuses == ['revealed', 'pending']
+
+    def test_open_period_is_never_immutable(self):
+        with Session(self.engine) as db:
+            self.rng_service.reveal_seed(db, "r_pending")
+
+        with TestClient(api.app) as client:
+            response = client.get("/periods/p1")
+
+        assert [entry['status'] for entry in response.json()['rounds']] == ['revealed', 'revealed']
+        assert response.headers['cache-control'] == api.PENDING_CACHE_CONTROL
+
+    def test_closed_daily_period_is_immutable(self):
+        with Session(self.engine) as db:
+            self.rng_service.encrypt_and_store_seed(
+                db, "r_old", SERVER_SEED, verifier.commitment_for(SERVER_SEED), "daily_2024-01-01"
+            )
+            self.rng_service.reveal_seed(db, "r_old")
+
+        with TestClient(api.app) as client:
+            response = client.get("/periods/daily_2024-01-01")
+
+        assert response.headers['cache-control'] == api.IMMUTABLE_CACHE_CONTROL
+
+    def test_period_closed(self):
+        today = date(2026, 10, 19)
+
+        assert api.period_closed("daily_2026-10-18", today)
+        assert not api.period_closed("daily_2026-10-19", today)
+        assert not api.period_closed("weekly_2026-42", today)
+        assert not api.period_closed("daily_garbage", today)
+
+    def test_ndjson_stream(self):
+        with TestClient(api.app) as client:
+            response = client.get("/rounds", params={'from_id': 1, 'limit': 10})
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('application/x-ndjson')
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line['round_id'] for line in lines] == ["r_revealed", "r_pending"]
+
+    def test_ndjson_stream_loads_snapshots_per_page(self, monkeypatch):
+        monkeypatch.setenv('API_CACHE_WARM', '0')
+        for index in range(5):
+            self._add_revealed(f"r_extra_{index}", snapshot=True)
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        with TestClient(api.app) as client:
+            lines = client.get("/rounds", params={'from_id': 1}).text.splitlines()
+
+        assert len(lines) == 7
+        # One page of seeds, one batch of snapshots, one empty next page
+        assert len(statements) == 3
+
+    def test_round_without_snapshot_is_not_cached(self):
+        self._add_revealed("r_no_snapshot")
+
+        with TestClient(api.app) as client:
+            response = client.get("/rounds/r_no_snapshot")
+
+        assert response.status_code == 200
+        assert response.json()['client_seeds'] == {}
+        assert response.headers['cache-control'] == api.PENDING_CACHE_CONTROL
+        assert api.revealed_cache.get("r_no_snapshot") is None
+
+    def _add_corrupt(self):
+        with self.router.primary_session() as db:
+            db.add(ProvableSeed(round_id="r_corrupt", commitment="0" * 64, encrypted_seed="garbage",
+                                revealed_at=datetime(2024, 1, 2)))
+            db.commit()
+
+    def test_bad_record_is_an_error_response(self):
+        self._add_corrupt()
+
+        with TestClient(api.app) as client:
+            response = client.get("/rounds/r_corrupt")
+
+        assert response.status_code == 500
+        assert response.json() == {'round_id': "r_corrupt", 'error': "round failed verification"}
+        assert response.headers['cache-control'] == 'no-store'
+
+    def test_bad_record_does_not_stop_stream(self):
+        self._add_corrupt()
+        self._add_revealed("r_after", snapshot=True)
+
+        with TestClient(api.app) as client:
+            lines = [json.loads(line) for line in client.get("/rounds").text.splitlines()]
+
+        assert [line['round_id'] for line in lines] == ["r_revealed", "r_pending", "r_corrupt", "r_after"]
+        assert 'error' in lines[2] and lines[3]['status'] == 'revealed'
+
+    def test_bad_record_does_not_stop_warm_up(self):
+        self._add_corrupt()
+
+        with TestClient(api.app) as client:
+            assert api.revealed_cache.get("r_revealed") is not None
+            assert client.get("/rounds/r_revealed").status_code == 200
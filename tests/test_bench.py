@@ -0,0 +1,21 @@
+from tools.bench import BENCHMARKS, compare, run_all
+
+class TestBench:
+    def test_run_all_smoke(self):
+        # A benchmark that raises during setup or timing must fail CI
+        results = run_all(None, None, repeat=1, min_time=0.001)
+
+        assert set(results) == set(BENCHMARKS)
+        assert all(result['best_us'] > 0 for result in results.values())
+
+    def test_payout_benchmark_runs_against_sqlite(self, tmp_path):
+        db_url = f"sqlite:///{tmp_path / 'bench.db'}"
+        results = run_all(["payout.process_payout"], db_url, repeat=1, min_time=0.001)
+
+        assert results["payout.process_payout"]['best_us'] > 0
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'best_us': 10.0}, 'b': {'best_us': 10.0}}
+        results = {'a': {'best_us': 10.5}, 'b': {'best_us': 12.0}, 'c': {'best_us': 1.0}}
+
+        assert compare(results, baseline, tolerance=0.10) == ['b']
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy import create_engine, event, select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from src.db.health import DatabaseHealth
+from src.db.models import Base, User, Bet, ProvableSeed, OutboxMessage
+from src.services.bet_intake import BetIntakeService
+from src.services.bet_journal import (
+    BetJournal, ExposureLimits, ExposureLimitExceeded, JournalCorruptError,
+    list_segments, read_journal
+)
+
+def _entry(ref, user_id=1, amount=1000, round_id="10_1"):
+    return {'ref': ref, 'user_id': user_id, 'chat_id': 10, 'round_id': round_id,
+            'bet_type': 'big', 'amount': amount, 'digits': None, 'ts': '2026-01-01T00:00:00'}
+
+class TestBetJournal:
+    def test_append_and_read(self, tmp_path):
+        async def run():
+            journal = BetJournal(str(tmp_path), fsync_batch=2)
+            await asyncio.gather(*(journal.append(_entry(str(i))) for i in range(5)))
+            journal.close()
+
+        asyncio.run(run())
+        assert [entry['ref'] for _, entry in read_journal(str(tmp_path))] == ['0', '1', '2', '3', '4']
+
+    def test_segment_rotation(self, tmp_path):
+        async def run():
+            journal = BetJournal(str(tmp_path), segment_max_bytes=300)
+            for i in range(6):
+                await journal.append(_entry(str(i)))
+            journal.close()
+
+        asyncio.run(run())
+        assert len(list_segments(str(tmp_path))) > 1
+        assert len(list(read_journal(str(tmp_path)))) == 6
+
+    def test_torn_tail_is_ignored(self, tmp_path):
+        async def run():
+            journal = BetJournal(str(tmp_path))
+            await journal.append(_entry('a'))
+            await journal.append(_entry('b'))
+            journal.close()
+
+        asyncio.run(run())
+        path = list_segments(str(tmp_path))[-1]
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        assert [entry['ref'] for _, entry in read_journal(str(tmp_path))] == ['a']
+
+    def test_corruption_before_tail_raises(self, tmp_path):
+        async def run():
+            journal = BetJournal(str(tmp_path))
+            await journal.append(_entry('a'))
+            await journal.append(_entry('b'))
+            journal.close()
+
+        asyncio.run(run())
+        path = list_segments(str(tmp_path))[-1]
+        with open(path, 'r+b') as f:
+            f.seek(10)
+            f.write(b'X')
+
+        with pytest.raises(JournalCorruptError):
+            list(read_journal(str(tmp_path)))
+
+    def test_exposure_limits_survive_restart(self, tmp_path):
+        limits = ExposureLimits(max_total=10_000, max_per_user=2_500)
+
+        async def run():
+            journal = BetJournal(str(tmp_path), limits)
+            await journal.append(_entry('a', amount=2000))
+            with pytest.raises(ExposureLimitExceeded):
+                await journal.append(_entry('b', amount=1000))
+            await journal.append(_entry('c', user_id=2, amount=1000))
+            journal.close()
+
+            reopened = BetJournal(str(tmp_path), limits)
+            assert reopened.total_exposure == 3000
+            with pytest.raises(ExposureLimitExceeded):
+                await reopened.append(_entry('d', amount=1000))
+            reopened.close()
+
+        asyncio.run(run())
+
+class TestDatabaseOutage:
+    """Chaos test: the database dies in the middle of a round and comes back."""
+
+    def setup_method(self):
+        self.db_down = False
+
+    def _engine(self, path):
+        engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+
+        @event.listens_for(engine, "do_connect")
+        def kill_switch(dialect, conn_rec, cargs, cparams):
+            if self.db_down:
+                raise OperationalError("connect", {}, Exception("database is down"))
+
+        Base.metadata.create_all(engine)
+        return engine
+
+    def test_bets_survive_outage(self, tmp_path):
+        engine = self._engine(tmp_path / "lottery.db")
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            db.add_all([User(id=1, telegram_id=101, balance=10_000), User(id=2, telegram_id=102, balance=500)])
+            db.add(ProvableSeed(round_id="10_0", commitment="c", encrypted_seed="e",
+                                revealed_at=func.now()))
+            db.commit()
+
+        health = DatabaseHealth(engine, failure_threshold=1, probe_interval=0)
+        journal = BetJournal(str(tmp_path / "journal"))
+        intake = BetIntakeService(SessionLocal, journal, health)
+
+        async def run():
+            first = await intake.place_bet(1, 10, "10_1", 'big', 1000)
+            assert first['success'] and not first['degraded']
+
+            # Kill the database mid-round
+            self.db_down = True
+            results = [
+                await intake.place_bet(1, 10, "10_1", 'small', 2000),
+                await intake.place_bet(2, 10, "10_1", 'odd', 1000),   # more than user 2 has
+                await intake.place_bet(1, 10, "10_0", 'even', 1000),  # round already settled
+                await intake.place_bet(1, 10, "10_1", 'even', 3000),
+            ]
+            assert all(r['success'] and r['degraded'] for r in results)
+            assert not health.healthy
+
+            with pytest.raises(OperationalError):
+                await intake.replay()
+
+            # Database comes back
+            self.db_down = False
+            assert health.probe()
+            return await intake.replay(), await intake.replay()
+
+        counts, second = asyncio.run(run())
+        journal.close()
+
+        assert counts == {'applied': 2, 'duplicate': 0, 'rejected': 2}
+        assert second == {'applied': 0, 'duplicate': 0, 'rejected': 0}
+        assert journal.entries == 0
+
+        with SessionLocal() as db:
+            amounts = sorted(db.execute(select(Bet.amount).where(Bet.user_id == 1)).scalars())
+            assert amounts == [1000, 2000, 3000]
+            assert db.get(User, 1).balance == 4000
+            assert db.get(User, 2).balance == 500
+            assert db.execute(select(func.count(OutboxMessage.id))).scalar() == 2
+
+    def test_exposure_limit_is_a_failed_bet(self, tmp_path):
+        engine = self._engine(tmp_path / "lottery.db")
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        health = DatabaseHealth(engine, failure_threshold=1, probe_interval=60)
+        journal = BetJournal(str(tmp_path / "journal"), ExposureLimits(max_per_user=2_500))
+        intake = BetIntakeService(SessionLocal, journal, health)
+        self.db_down = True
+
+        async def run():
+            return [
+                await intake.place_bet(1, 10, "10_1", 'big', 2000),
+                await intake.place_bet(1, 10, "10_1", 'big', 1000),
+            ]
+
+        accepted, rejected = asyncio.run(run())
+        journal.close()
+
+        assert accepted['success'] and accepted['degraded']
+        assert rejected == {'success': False, 'error': "Per-user degraded-mode exposure limit reached"}
+        assert journal.entries == 1
+
+    def test_recovery_survives_replay_errors(self, tmp_path):
+        engine = self._engine(tmp_path / "lottery.db")
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        journal = BetJournal(str(tmp_path / "journal"))
+        intake = BetIntakeService(SessionLocal, journal, DatabaseHealth(engine))
+        calls = []
+
+        async def replay():
+            calls.append(1)
+            if len(calls) == 1:
+                raise JournalCorruptError("CRC mismatch")
+            journal.entries = 0
+
+        intake.replay = replay
+
+        async def run():
+            await journal.append(_entry('a'))
+            task = asyncio.create_task(intake.run_recovery(interval=0))
+            while journal.entries:
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+        journal.close()
+        assert len(calls) == 2
@@ -0,0 +1,70 @@
+import json
+import sys
+import pytest
+from src.verifier import compute_digits
+from tools.capacity_sim import main, replay_payouts, simulate_batch, merge, round_server_seed, is_win
+
+PARAMS = {
+    'seed': 7, 'chats': 3, 'users': 50, 'bettors_per_round': 4.0, 'extra_bets_per_bettor': 0.5,
+    'max_bet_multiple': 10, 'round_seconds': 60.0, 'min_bet': 1000,
+    'win_multiplier': 1.97, 'house_rate': 0.03,
+}
+
+class TestCapacitySim:
+    def test_deterministic(self):
+        assert simulate_batch((0, 200, PARAMS)) == simulate_batch((0, 200, PARAMS))
+
+    def test_merge_adds_up(self):
+        first = simulate_batch((0, 100, PARAMS))
+        second = simulate_batch((100, 100, PARAMS))
+        rounds = first['rounds'] + second['rounds']
+        bets = first['bets'] + second['bets']
+
+        merged = merge(first, second)
+
+        assert merged['rounds'] == rounds == 200
+        assert merged['bets'] == bets
+        assert sum(merged['payouts_per_round_hist'].values()) == 200
+        assert sum(merged['last_digit_hist']) == 200
+
+    def test_win_rules(self):
+        result = {'size': 'small', 'parity': 'even'}
+
+        assert is_win('small', result) and is_win('even', result)
+        assert not is_win('big', result) and not is_win('odd', result)
+
+    def test_uses_real_derivation(self):
+        totals = simulate_batch((5, 1, PARAMS))
+        digits = compute_digits(round_server_seed(7, 5), "2_5")
+
+        assert totals['last_digit_hist'][digits[-1]] == 1
+
+    def test_main_writes_report(self, tmp_path, monkeypatch):
+        output = tmp_path / "report.json"
+        monkeypatch.setattr(sys, 'argv', ['capacity_sim', '--rounds', '50', '--workers', '1',
+                                          '--batch-size', '20', '--output', str(output)])
+        main()
+
+        report = json.loads(output.read_text())
+        assert report['simulation']['rounds'] == 50
+
+    def test_main_rejects_zero_rounds(self, monkeypatch):
+        monkeypatch.setattr(sys, 'argv', ['capacity_sim', '--rounds', '0'])
+        with pytest.raises(SystemExit) as excinfo:
+            main()
+        assert excinfo.value.code == 2
+
+    def test_replay_measures_successful_payouts(self, tmp_path):
+        payout_ms = replay_payouts(f"sqlite:///{tmp_path / 'sim.db'}", PARAMS, rounds=5)
+
+        assert payout_ms is not None and payout_ms > 0
+
+    def test_replay_aborts_on_failed_payout(self, tmp_path, monkeypatch):
+        from src.services.payout_service import PayoutService
+
+        async def failing(self, user_id, amount, round_id=None, **kwargs):
+            return {'success': False, 'error': 'boom', 'tx_ref': 'x'}
+
+        monkeypatch.setattr(PayoutService, 'process_payout', failing)
+        with pytest.raises(RuntimeError, match='boom'):
+            replay_payouts(f"sqlite:///{tmp_path / 'sim.db'}", PARAMS, rounds=5)
@@ -0,0 +1,99 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from src.admin.force_flow import ForceFlowService
+from src.db.models import Base, ForcedAction, ProvableSeed
+from src.db.routing import ReplicaRouter
+from src.services.rng_service import RNGService
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestReplicaRouter:
+    def setup_method(self):
+        self.primary = create_engine("sqlite://")
+        self.replica = create_engine("sqlite://")
+        for engine in (self.primary, self.replica):
+            Base.metadata.create_all(engine)
+
+        self.lag = 0.0
+        self.probes = 0
+        self.clock = FakeClock()
+
+        def lag_probe(engine):
+            self.probes += 1
+            if self.lag is None:
+                raise ConnectionError("replica down")
+            return self.lag
+
+        self.router = ReplicaRouter(self.primary, [self.replica], max_lag_seconds=2.0,
+                                    ryw_window=5.0, lag_check_interval=1.0,
+                                    lag_probe=lag_probe, clock=self.clock)
+
+    def test_reads_go_to_fresh_replica(self):
+        assert self.router.choose_engine() is self.replica
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        self.lag = 10.0
+        assert self.router.choose_engine() is self.primary
+
+        # Lag is cached until the next check interval
+        self.lag = 0.0
+        assert self.router.choose_engine() is self.primary
+        self.clock.now += 1.0
+        assert self.router.choose_engine() is self.replica
+        assert self.probes == 2
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        self.lag = None
+        assert self.router.choose_engine() is self.primary
+
+    def test_read_your_writes(self):
+        self.router.mark_write(42)
+
+        assert self.router.choose_engine(42) is self.primary
+        assert self.router.choose_engine(7) is self.replica
+
+        self.clock.now += 5.0
+        assert self.router.choose_engine(42) is self.replica
+
+    def test_revealed_seed_falls_back_when_replica_is_behind(self):
+        rng_service = RNGService("test-encryption-key", self.router)
+        with Session(self.primary) as db:
+            db.add(ProvableSeed(round_id="r1", commitment="c", encrypted_seed="e",
+                                revealed_at=datetime.utcnow()))
+            db.add(ProvableSeed(round_id="r2", commitment="c", encrypted_seed="e"))
+            db.commit()
+
+        statements = []
+        event.listen(self.primary, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        # The simulated replica never received these rows
+        assert rng_service.find_seed_for_round("r1").revealed_at is not None
+        assert rng_service.find_seed_for_round("r2").revealed_at is None
+        assert rng_service.find_seed_for_round("missing") is None
+        # One primary query per lookup
+        assert len(statements) == 3
+
+    def test_seed_lookup_requires_router(self):
+        with pytest.raises(RuntimeError):
+            RNGService("test-encryption-key").find_seed_for_round("r1")
+
+    def test_force_history_reads_from_replica(self):
+        with Session(self.replica) as db:
+            db.add(ForcedAction(chat_id=10, requested_by=1, forced_value='big', audit_ref='a1'))
+            db.commit()
+
+        statements = []
+        event.listen(self.primary, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        with Session(self.primary) as db:
+            force_flow = ForceFlowService(db, RNGService("test-encryption-key"), [1], router=self.router)
+            history = force_flow.get_force_history(chat_id=10)
+
+        assert [action.audit_ref for action in history] == ['a1']
+        assert not statements
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+import redis.asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
+from telegram.ext import ApplicationHandlerStop
+from src.bot.flood_control import (
+    ADMISSION_FILTER, FloodControl, ADMITTED, DUPLICATE, USER_LIMITED, CHAT_LIMITED
+)
+
+class DownRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls += 1
+            raise RedisConnectionError("redis is down")
+        return run
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text):
+        self.replies.append(text)
+
+def _update(update_id, user_id=1, chat_id=10, message=None):
+    return SimpleNamespace(update_id=update_id, effective_user=SimpleNamespace(id=user_id),
+                           effective_chat=SimpleNamespace(id=chat_id), effective_message=message)
+
+def _verdicts(flood_control, checks):
+    async def run():
+        return [await flood_control.check(*check) for check in checks]
+    return asyncio.run(run())
+
+LIMIT_CHECKS = [(1, 1, 10), (2, 1, 10), (3, 1, 10), (4, 2, 10), (5, 3, 10), (4, 2, 10)]
+LIMIT_VERDICTS = [ADMITTED, ADMITTED, USER_LIMITED, ADMITTED, CHAT_LIMITED, DUPLICATE]
+
+class TestFloodControl:
+    def test_local_user_and_chat_limits(self):
+        flood_control = FloodControl(window_seconds=60, user_limit=2, chat_limit=3)
+
+        assert _verdicts(flood_control, LIMIT_CHECKS) == LIMIT_VERDICTS
+
+    def test_redis_script_matches_local_limits(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        flood_control = FloodControl(fakeredis.FakeAsyncRedis(), window_seconds=60,
+                                     user_limit=2, chat_limit=3)
+
+        assert _verdicts(flood_control, LIMIT_CHECKS) == LIMIT_VERDICTS
+        assert not flood_control._buckets
+
+    def test_duplicate_updates(self):
+        flood_control = FloodControl()
+
+        assert _verdicts(flood_control, [(1, 1, 10), (1, 1, 10)]) == [ADMITTED, DUPLICATE]
+
+    def test_falls_back_when_redis_is_down(self):
+        redis = DownRedis()
+        flood_control = FloodControl(redis, user_limit=1)
+
+        assert _verdicts(flood_control, [(1, 1, 10), (2, 1, 10)]) == [ADMITTED, USER_LIMITED]
+        # Redis isn't retried on every update while it is down
+        assert redis.calls == 1
+
+    def test_unresponsive_redis_times_out_to_local_limits(self):
+        async def run():
+            # Accepts connections and never answers
+            server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = redis.asyncio.Redis(port=port, socket_connect_timeout=0.1, socket_timeout=0.1)
+            flood_control = FloodControl(client, user_limit=1)
+
+            started = time.monotonic()
+            verdicts = [await flood_control.check(1, 1, 10), await flood_control.check(2, 1, 10)]
+            elapsed = time.monotonic() - started
+            server.close()
+            return verdicts, elapsed
+
+        verdicts, elapsed = asyncio.run(run())
+        assert verdicts == [ADMITTED, USER_LIMITED]
+        assert elapsed < 2
+
+    def test_admission_is_scoped_to_commands_and_bets(self):
+        for text in ("/start", "/N1000", "/S123456 500"):
+            assert ADMISSION_FILTER.filter(SimpleNamespace(text=text))
+        assert not ADMISSION_FILTER.filter(SimpleNamespace(text="hello all"))
+
+    def test_rejected_update_stops_handlers_with_one_reply(self):
+        flood_control = FloodControl(user_limit=1)
+        message = FakeMessage()
+
+        async def run():
+            await flood_control(_update(1, message=message), None)
+            for update_id in (2, 3):
+                with pytest.raises(ApplicationHandlerStop):
+                    await flood_control(_update(update_id, message=message), None)
+
+        asyncio.run(run())
+        assert len(message.replies) == 1
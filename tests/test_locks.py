@@ -0,0 +1,47 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from src.utils import locks
+from src.utils.profiling import UpdateProfiler
+from src.utils.locks import user_lock
+
+class Account:
+    def __init__(self):
+        self.events = []
+
+    @user_lock
+    async def work(self, user_id, tag):
+        self.events.append(('start', user_id, tag))
+        await asyncio.sleep(0.01)
+        self.events.append(('end', user_id, tag))
+
+class TestUserLock:
+    def test_serializes_per_user(self):
+        account = Account()
+
+        async def run():
+            await asyncio.gather(account.work(1, 'a'), account.work(1, 'b'), account.work(2, 'c'))
+
+        asyncio.run(run())
+        user_1 = [event for event in account.events if event[1] == 1]
+        assert user_1 == [('start', 1, 'a'), ('end', 1, 'a'), ('start', 1, 'b'), ('end', 1, 'b')]
+        # User 2 didn't wait behind user 1
+        assert account.events.index(('start', 2, 'c')) < account.events.index(('end', 1, 'a'))
+        assert not locks._user_locks and not locks._waiters
+
+    def test_wait_is_traced(self, tmp_path):
+        account = Account()
+        profiler = UpdateProfiler(slow_threshold=0.0, dump_dir=str(tmp_path))
+
+        async def handler(update, context):
+            await account.work(1, update.update_id)
+
+        async def run():
+            traced = profiler.wrap(handler)
+            await asyncio.gather(*(traced(SimpleNamespace(update_id=n), None) for n in (1, 2)))
+
+        asyncio.run(run())
+        waits = sorted(
+            json.loads(path.read_text())['span_totals_ms']['user_lock'] for path in tmp_path.glob('*.json')
+        )
+        assert waits[0] < 5 and waits[1] >= 9
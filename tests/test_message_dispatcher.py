@@ -0,0 +1,122 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from telegram.error import RetryAfter, NetworkError
+from src.db.models import Base, OutboxMessage, OutboxStatus
+from src.services.message_dispatcher import MessageDispatcher, enqueue_message, coalesce
+from src.utils.rate_limit import TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeBot:
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+
+    async def send_message(self, chat_id, text):
+        error = self.errors.pop(chat_id, None)
+        if error:
+            raise error
+        self.sent.append((chat_id, text))
+
+class TestTokenBucket:
+    def test_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == pytest.approx(0.5)
+
+        clock.now += 0.5
+        assert bucket.try_acquire() == 0
+
+    def test_pause(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, clock=clock)
+        bucket.pause(3)
+
+        assert bucket.try_acquire() == pytest.approx(3)
+        clock.now += 3
+        assert bucket.try_acquire() == pytest.approx(0.1)
+
+class TestMessageDispatcher:
+    def setup_method(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def _enqueue(self, *messages):
+        with self.SessionLocal() as db:
+            for chat_id, text in messages:
+                enqueue_message(db, chat_id, text)
+            db.commit()
+
+    def _statuses(self):
+        with self.SessionLocal() as db:
+            return {m.text: (m.status, m.attempts) for m in db.execute(select(OutboxMessage)).scalars()}
+
+    def test_coalesce_respects_length(self):
+        messages = [OutboxMessage(text="x" * 10) for _ in range(3)]
+
+        sends = coalesce(messages, max_length=22)
+        assert [len(group) for group, _ in sends] == [2, 1]
+        assert sends[0][1] == "x" * 10 + "\n\n" + "x" * 10
+
+    def test_coalesce_truncates_oversized_message(self):
+        messages = [OutboxMessage(text="short"), OutboxMessage(text="y" * 30), OutboxMessage(text="end")]
+
+        sends = coalesce(messages, max_length=20)
+        assert [text for _, text in sends] == ["short", "y" * 19 + "…", "end"]
+        assert all(len(text) <= 20 for _, text in sends)
+
+    def test_coalesces_per_chat(self):
+        self._enqueue((1, "a"), (2, "b"), (1, "c"))
+        bot = FakeBot()
+        dispatcher = MessageDispatcher(self.SessionLocal, bot, global_rate=1000, per_chat_rate=1000)
+
+        assert asyncio.run(dispatcher.dispatch_once()) == 3
+        assert sorted(bot.sent) == [(1, "a\n\nc"), (2, "b")]
+        assert all(status == OutboxStatus.SENT.value for status, _ in self._statuses().values())
+
+    def test_retry_after_reschedules_without_attempt(self):
+        self._enqueue((1, "a"), (2, "b"))
+        bot = FakeBot(errors={1: RetryAfter(30)})
+        dispatcher = MessageDispatcher(self.SessionLocal, bot, global_rate=1000, per_chat_rate=1000)
+
+        asyncio.run(dispatcher.dispatch_once())
+
+        assert bot.sent == [(2, "b")]
+        assert self._statuses()["a"] == (OutboxStatus.PENDING.value, 0)
+        # Still inside the retry window
+        assert asyncio.run(dispatcher.dispatch_once()) == 0
+
+    def test_paused_chat_does_not_hold_up_batch(self):
+        self._enqueue((1, "a"), (2, "b"))
+        bot = FakeBot()
+        dispatcher = MessageDispatcher(self.SessionLocal, bot, global_rate=1000, per_chat_rate=1000)
+        dispatcher._chat_bucket(1).pause(3)
+
+        started = time.monotonic()
+        asyncio.run(dispatcher.dispatch_once())
+
+        assert time.monotonic() - started < 1
+        assert bot.sent == [(2, "b")]
+        assert self._statuses()["a"] == (OutboxStatus.PENDING.value, 0)
+        assert self._statuses()["b"][0] == OutboxStatus.SENT.value
+
+    def test_gives_up_after_max_attempts(self):
+        self._enqueue((1, "a"))
+        bot = FakeBot(errors={1: NetworkError("boom")})
+        dispatcher = MessageDispatcher(self.SessionLocal, bot, global_rate=1000, max_attempts=1)
+
+        asyncio.run(dispatcher.dispatch_once())
+
+        assert self._statuses()["a"] == (OutboxStatus.FAILED.value, 1)
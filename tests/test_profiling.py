@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from src.utils.profiling import UpdateProfiler, NULL_SPAN, annotate, span
+
+def _update(chat_id=10, user_id=101):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id),
+                           effective_user=SimpleNamespace(id=user_id), update_id=1)
+
+class TestUpdateProfiler:
+    def test_disabled_is_a_no_op(self):
+        async def handler(update, context):
+            pass
+
+        profiler = UpdateProfiler()
+        assert profiler.wrap(handler) is handler
+        assert span('db') is NULL_SPAN
+
+    def test_slow_update_is_dumped(self, tmp_path):
+        async def handler(update, context):
+            annotate(round_id="10_1")
+            with span('rng'):
+                time.sleep(0.02)
+            await asyncio.sleep(0.1)
+
+        profiler = UpdateProfiler(slow_threshold=0.05, dump_dir=str(tmp_path),
+                                  sample_rate=1.0, profile_sampled=True, watchdog_interval=0.01)
+        asyncio.run(profiler.wrap(handler)(_update(), None))
+
+        dumps = list(tmp_path.glob('*.json'))
+        assert len(dumps) == 1
+        assert list(tmp_path.glob('*.prof'))
+
+        report = json.loads(dumps[0].read_text())
+        assert report['context'] == {'chat_id': 10, 'user_id': 101, 'update_id': 1, 'round_id': '10_1'}
+        assert report['span_totals_ms']['rng'] >= 20
+        assert report['duration_ms'] >= 100
+        assert 'handler' in report['stack']['task']
+        assert report['profile']
+
+    def test_fast_update_is_not_dumped(self, tmp_path):
+        async def handler(update, context):
+            return 'ok'
+
+        profiler = UpdateProfiler(slow_threshold=1.0, dump_dir=str(tmp_path))
+        assert asyncio.run(profiler.wrap(handler)(_update(), None)) == 'ok'
+        assert not list(tmp_path.iterdir())
+
+    def test_db_spans_cover_every_engine_and_failed_statements(self, tmp_path):
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.exc import OperationalError
+
+        primary = create_engine("sqlite://")
+        replica = create_engine("sqlite://")
+        profiler = UpdateProfiler(slow_threshold=0.0, dump_dir=str(tmp_path))
+        for engine in (primary, replica):
+            profiler.instrument_engine(engine)
+
+        async def handler(update, context):
+            for engine in (primary, replica):
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    try:
+                        conn.execute(text("SELECT * FROM missing_table"))
+                    except OperationalError:
+                        pass
+                    assert not conn.info.get('profiling_started')
+
+        asyncio.run(profiler.wrap(handler)(_update(), None))
+
+        report = json.loads(next(tmp_path.glob('*.json')).read_text())
+        assert [entry['name'] for entry in report['spans']] == ['db'] * 4
+
+    def test_span_totals_add_up(self, tmp_path):
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine("sqlite://")
+        profiler = UpdateProfiler(slow_threshold=0.0, dump_dir=str(tmp_path))
+        profiler.instrument_engine(engine)
+
+        async def handler(update, context):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                with span('row_lock'):
+                    conn.execute(text("SELECT 1"))
+                    time.sleep(0.02)
+                    with span('rng'):
+                        time.sleep(0.02)
+
+        asyncio.run(profiler.wrap(handler)(_update(), None))
+
+        report = json.loads(next(tmp_path.glob('*.json')).read_text())
+        # The statement inside row_lock isn't also a db span, and rng isn't counted in row_lock
+        assert [entry['name'] for entry in report['spans']] == ['db', 'rng', 'row_lock']
+        totals = report['span_totals_ms']
+        assert 20 <= totals['row_lock'] < 35 and totals['rng'] >= 20
+        assert sum(totals.values()) <= report['duration_ms']
@@ -0,0 +1,92 @@
+import json
+from datetime import datetime
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from src.db.models import Base, User, Bet, Payout, PayoutStatus
+from tools.reconcile import merge_walk, partition_ranges, reconcile
+
+OLD = datetime(2024, 1, 1)
+
+class TestMergeWalk:
+    def test_balance_mismatch(self):
+        users = iter([(1, 900), (2, 1000), (3, 1500)])
+        bets = iter([(1, 100), (2, 100)])
+        payouts = iter([(3, 400)])
+
+        items = list(merge_walk(users, bets, payouts, start_bonus=1000))
+
+        assert items == [
+            {'user_id': 2, 'kind': 'balance_mismatch', 'balance': 1000, 'expected': 900,
+             'diff': 100, 'bets_total': 100, 'payouts_total': 0},
+            {'user_id': 3, 'kind': 'balance_mismatch', 'balance': 1500, 'expected': 1400,
+             'diff': 100, 'bets_total': 0, 'payouts_total': 400},
+        ]
+
+    def test_orphans(self):
+        users = iter([(2, 1000)])
+        bets = iter([(1, 50), (3, 70)])
+        payouts = iter([(1, 20), (4, 30)])
+
+        kinds = [(item['user_id'], item['kind']) for item in merge_walk(users, bets, payouts, 1000)]
+
+        assert kinds == [(1, 'orphan_bets'), (1, 'orphan_payouts'), (3, 'orphan_bets'), (4, 'orphan_payouts')]
+
+class TestPartitionRanges:
+    def test_covers_range_without_overlap(self):
+        ranges = partition_ranges(1, 10, 3)
+
+        assert ranges == [(1, 5), (5, 9), (9, 11)]
+
+    def test_more_partitions_than_ids(self):
+        assert partition_ranges(5, 6, 4) == [(5, 6), (6, 7)]
+
+class TestReconcileRun:
+    def _setup_db(self, tmp_path):
+        db_url = f"sqlite:///{tmp_path / 'lottery.db'}"
+        engine = create_engine(db_url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add_all([
+                User(id=1, telegram_id=101, balance=900, updated_at=OLD),
+                User(id=2, telegram_id=102, balance=1000, updated_at=OLD),   # missing bet deduction
+                User(id=3, telegram_id=103, balance=1000, updated_at=OLD),   # missing payout credit
+                User(id=4, telegram_id=104, balance=1000, updated_at=OLD),
+                Bet(user_id=1, chat_id=10, round_id="10_1", bet_type='big', amount=100, created_at=OLD),
+                Bet(user_id=2, chat_id=10, round_id="10_1", bet_type='big', amount=100, created_at=OLD),
+                Payout(tx_ref="p1", user_id=3, amount=200, status=PayoutStatus.DONE.value, created_at=OLD),
+            ])
+            db.commit()
+        return db_url, engine
+
+    def _report(self, path):
+        with open(path) as f:
+            return sorted(json.loads(line)['user_id'] for line in f)
+
+    def test_full_then_incremental(self, tmp_path):
+        db_url, engine = self._setup_db(tmp_path)
+        report = str(tmp_path / "report.jsonl")
+        checkpoint = str(tmp_path / "checkpoint.json")
+
+        summary = reconcile(db_url, 2, 1000, report, checkpoint)
+        assert summary['checked'] == 4
+        assert summary['discrepancies'] == 2
+        assert self._report(report) == [2, 3]
+
+        # No new activity: the open discrepancies are still reported
+        summary = reconcile(db_url, 2, 1000, report, checkpoint, incremental=True)
+        assert summary['mode'] == 'incremental'
+        assert summary['discrepancies'] == 2
+        assert self._report(report) == [2, 3]
+
+        # Fix user 2 and give user 4 a new, unbalanced bet
+        with Session(engine) as db:
+            db.execute(update(User).where(User.id == 2).values(balance=900, updated_at=OLD))
+            db.add(Bet(user_id=4, chat_id=10, round_id="10_2", bet_type='odd', amount=50,
+                       created_at=datetime(2100, 1, 1)))
+            db.commit()
+
+        summary = reconcile(db_url, 2, 1000, report, checkpoint, incremental=True)
+        assert summary['checked'] == 3
+        assert self._report(report) == [3, 4]
+        with open(checkpoint) as f:
+            assert json.load(f)['open_user_ids'] == [3, 4]
@@ -1,4 +1,7 @@
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from src.db.models import Base, User, Bet
 from src.services.rng_service import RNGService
 from src.utils.convert import bytes_to_digits_unbiased
 
@@ -55,5 +58,54 @@ class TestRNGService:
         assert digits == [1, 2, 3, 4, 5, 6]
         assert all(0 <= d <= 9 for d in digits)
 
+    def test_verify_round_with_client_seed_snapshot(self):
+        server_seed = "d" * 64
+        round_id = "test_round_4"
+        snapshot = {"7": "user_seed_7"}
+        
+        digits = self.rng_service.compute_digits(server_seed, round_id, "user_seed_7")
+        is_valid, computed_digits, _ = self.rng_service.verify_round(
+            server_seed, round_id, expected_digits=digits, client_seeds=snapshot, user_id=7
+        )
+        
+        assert is_valid
+        assert computed_digits == digits
+    
+    def test_snapshot_client_seeds(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add_all([
+                User(id=1, telegram_id=101, client_seed="seed_1"),
+                User(id=2, telegram_id=102, client_seed=None),
+                User(id=3, telegram_id=103, client_seed="seed_3"),
+            ])
+            for user_id in (1, 1, 2):
+                db.add(Bet(user_id=user_id, chat_id=10, round_id="10_1", bet_type="big", amount=1000))
+            db.commit()
+            
+            snapshot = self.rng_service.snapshot_client_seeds(db, "10_1")
+            assert snapshot.seeds == {"1": "seed_1"}
+            
+            # Later changes don't affect the frozen snapshot
+            db.get(User, 1).client_seed = "changed"
+            db.commit()
+            assert self.rng_service.snapshot_client_seeds(db, "10_1").digest == snapshot.digest
+            assert self.rng_service.get_client_seed_snapshot(db, "10_1") == {"1": "seed_1"}
+            assert self.rng_service.get_client_seed_snapshot(db, "10_2") == {}
+    
+    def test_reveal_seed_freezes_client_seeds(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        server_seed, commitment = self.rng_service.generate_server_seed()
+        with Session(engine) as db:
+            db.add(User(id=1, telegram_id=101, client_seed="seed_1"))
+            db.add(Bet(user_id=1, chat_id=10, round_id="10_1", bet_type="big", amount=1000))
+            self.rng_service.encrypt_and_store_seed(db, "10_1", server_seed, commitment)
+            
+            assert self.rng_service.reveal_seed(db, "10_1") == server_seed
+            assert self.rng_service.get_seed_for_round(db, "10_1").revealed_at is not None
+            assert self.rng_service.get_client_seed_snapshot(db, "10_1") == {"1": "seed_1"}
+
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import pytest
+import redis.asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from src.db.models import Base, User, Bet, Payout, PayoutStatus, UserStats, ChatStats, DailyStats
+from src.services.stats_service import StatsService, update_leaderboards
+from tools.rebuild_stats import rebuild_tables
+
+class DownRedis:
+    async def zrevrange(self, *args, **kwargs):
+        raise RedisConnectionError("redis is down")
+
+class TestStatsService:
+    def setup_method(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = Session(engine)
+        self.db.add_all([User(id=1, telegram_id=101, balance=0), User(id=2, telegram_id=102, balance=0)])
+        self.db.commit()
+        self.stats_service = StatsService(self.db)
+
+    def _snapshot(self):
+        return {
+            model.__tablename__: sorted(
+                (tuple(getattr(row, c.name) for c in model.__table__.columns if c.name != 'updated_at'))
+                for row in self.db.execute(select(model)).scalars()
+            )
+            for model in (UserStats, ChatStats, DailyStats)
+        }
+
+    def test_incremental_matches_rebuild(self):
+        for user_id, chat_id, amount in [(1, 10, 1000), (1, 10, 2000), (2, 20, 5000)]:
+            self.db.add(Bet(user_id=user_id, chat_id=chat_id, round_id=f"{chat_id}_1", bet_type='big', amount=amount))
+            self.stats_service.record_bet(user_id, chat_id, amount)
+        self.db.add(Payout(tx_ref='t1', user_id=1, amount=1970, round_id='10_1', status=PayoutStatus.DONE.value))
+        self.stats_service.record_payout(1, 1970, self.stats_service.round_chat_id('10_1'))
+        self.db.commit()
+
+        incremental = self._snapshot()
+        rebuild_tables(self.db)
+        self.db.commit()
+
+        assert self._snapshot() == incremental
+        assert self.stats_service.get_user_stats(101).wagered == 3000
+        assert self.stats_service.get_chat_stats(10).payouts_total == 1970
+
+    def test_top_without_redis(self):
+        self.stats_service.record_bet(1, 10, 1000)
+        self.stats_service.record_bet(2, 10, 3000)
+        self.db.commit()
+
+        assert asyncio.run(self.stats_service.top('wagered')) == [(2, 3000), (1, 1000)]
+
+    def test_top_falls_back_when_redis_is_down(self):
+        self.stats_service.record_bet(1, 10, 1000)
+        self.stats_service.record_bet(2, 10, 3000)
+        self.db.commit()
+        stats_service = StatsService(self.db, DownRedis())
+
+        assert asyncio.run(stats_service.top('wagered')) == [(2, 3000), (1, 1000)]
+        assert asyncio.run(stats_service.top('wagered', chat_id=10)) == []
+
+    def test_leaderboards_in_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        stats_service = StatsService(self.db, fakeredis.FakeAsyncRedis())
+
+        async def run():
+            await stats_service.update_leaderboards(1, 10, wagered=1000)
+            await stats_service.update_leaderboards(2, 20, wagered=3000, won=500)
+            return (await stats_service.top('wagered'), await stats_service.top('won'),
+                    await stats_service.top('wagered', chat_id=10))
+
+        assert asyncio.run(run()) == ([(2, 3000), (1, 1000)], [(2, 500)], [(1, 1000)])
+
+    def test_unresponsive_redis_times_out(self):
+        self.stats_service.record_bet(1, 10, 1000)
+        self.db.commit()
+
+        async def run():
+            # Accepts connections and never answers
+            server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = redis.asyncio.Redis(port=port, socket_connect_timeout=0.1, socket_timeout=0.1)
+            stats_service = StatsService(self.db, client)
+
+            started = time.monotonic()
+            await update_leaderboards(client, 1, 10, wagered=1000)
+            entries = await stats_service.top('wagered')
+            elapsed = time.monotonic() - started
+            server.close()
+            return entries, elapsed
+
+        entries, elapsed = asyncio.run(run())
+        assert entries == [(1, 1000)]
+        assert elapsed < 2
+
+    def test_round_chat_id_from_bets(self):
+        self.db.add_all([
+            Bet(user_id=1, chat_id=20, round_id='r1', bet_type='big', amount=1000),
+            Bet(user_id=2, chat_id=10, round_id='r1', bet_type='odd', amount=1000),
+        ])
+        self.db.commit()
+
+        assert self.stats_service.round_chat_id('r1') == 10
+        assert self.stats_service.round_chat_id('unknown') is None
@@ -0,0 +1,72 @@
+import io
+import json
+import pytest
+from src.verifier import client_seeds_digest, commitment_for, compute_digits, outcome, verify
+from src.verifier.__main__ import serve
+
+class TestVerifier:
+    def test_compute_digits_deterministic(self):
+        digits1 = compute_digits("a" * 64, "test_round_1")
+        digits2 = compute_digits("a" * 64, "test_round_1")
+
+        assert digits1 == digits2
+        assert len(digits1) == 6
+        assert all(0 <= d <= 9 for d in digits1)
+
+    def test_client_seed_changes_digits(self):
+        digits1 = compute_digits("b" * 64, "test_round_2")
+        digits2 = compute_digits("b" * 64, "test_round_2", "user_seed_123")
+
+        assert digits1 != digits2
+
+    def test_matches_rng_service(self):
+        pytest.importorskip("sqlalchemy")
+        pytest.importorskip("cryptography")
+        from src.services.rng_service import RNGService
+
+        rng_service = RNGService("test-encryption-key")
+        assert rng_service.compute_digits("c" * 64, "r1", "cs") == compute_digits("c" * 64, "r1", "cs")
+
+    def test_verify_commitment(self):
+        server_seed = "d" * 64
+        result = verify("test_round_3", server_seed, commitment_for(server_seed))
+
+        assert result['ok']
+        assert result['commitment_ok']
+        assert result.items() >= outcome(result['digits']).items()
+
+        assert not verify("test_round_3", server_seed, "0" * 64)['ok']
+
+    def test_verify_expected_digits(self):
+        digits = compute_digits("e" * 64, "test_round_4")
+
+        assert verify("test_round_4", "e" * 64, expected_digits=digits)['digits_ok']
+        assert not verify("test_round_4", "e" * 64, expected_digits=[0] * 5)['ok']
+
+    def test_serve_jsonl(self):
+        server_seed = "f" * 64
+        requests = [
+            {"id": 1, "round_id": "r1", "server_seed": server_seed, "commitment": commitment_for(server_seed)},
+            {"id": 2, "round_id": "r2", "server_seed": server_seed, "commitment": "0" * 64},
+        ]
+        stdin = io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n\nnot json\n")
+        stdout = io.StringIO()
+
+        failures = serve(stdin, stdout)
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+        assert failures == 2
+        assert [r.get('id') for r in results] == [1, 2, None]
+        assert results[0]['ok'] and not results[1]['ok']
+        assert 'error' in results[2]
+
+    def test_serve_with_client_seed_snapshot(self):
+        snapshot = {"7": "user_seed_7"}
+        digits = compute_digits("a" * 64, "r1", "user_seed_7")
+        request = {"round_id": "r1", "server_seed": "a" * 64, "client_seeds": snapshot,
+                   "client_seeds_digest": client_seeds_digest(snapshot), "user_id": 7,
+                   "expected_digits": digits}
+        stdout = io.StringIO()
+
+        assert serve(io.StringIO(json.dumps(request) + "\n"), stdout) == 0
+        assert json.loads(stdout.getvalue())['client_seeds_ok']
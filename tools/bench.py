@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the RNG, crypto, payout and settlement hot paths.
+
+Usage:
+    python -m tools.bench                                  # run and print
+    python -m tools.bench --save benchmarks/baseline.json  # store a baseline
+    python -m tools.bench --compare benchmarks/baseline.json --tolerance 0.15
+
+The payout benchmark runs against a local database given by --db-url or
+BENCH_DATABASE_URL and is skipped when neither is set.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+BENCH_ENCRYPTION_KEY = "bench-encryption-key"
+
+
+def _bench_compute_digits() -> Callable[[], None]:
+    from src.services.rng_service import RNGService
+
+    rng_service = RNGService(BENCH_ENCRYPTION_KEY)
+    server_seed, _ = rng_service.generate_server_seed()
+    return lambda: rng_service.compute_digits(server_seed, "bench_round_1", "bench_client_seed")
+
+
+def _bench_generate_server_seed() -> Callable[[], None]:
+    from src.services.rng_service import RNGService
+
+    rng_service = RNGService(BENCH_ENCRYPTION_KEY)
+    return rng_service.generate_server_seed
+
+
+def _bench_derive_key() -> Callable[[], None]:
+    """The uncached PBKDF2 cost, paid once per process and key."""
+    from src.utils.crypto import derive_key
+
+    return lambda: derive_key.__wrapped__(BENCH_ENCRYPTION_KEY)
+
+
+def _bench_encrypt_seed() -> Callable[[], None]:
+    from src.utils.crypto import encrypt_seed
+
+    server_seed = "a" * 64
+    # The first call derives and caches the key; time the steady state
+    encrypt_seed(server_seed, BENCH_ENCRYPTION_KEY)
+    return lambda: encrypt_seed(server_seed, BENCH_ENCRYPTION_KEY)
+
+
+def _bench_decrypt_seed() -> Callable[[], None]:
+    from src.utils.crypto import encrypt_seed, decrypt_seed
+
+    encrypted = encrypt_seed("a" * 64, BENCH_ENCRYPTION_KEY)
+    if decrypt_seed(encrypted, BENCH_ENCRYPTION_KEY) != "a" * 64:
+        raise RuntimeError("decrypt_seed does not round-trip encrypt_seed")
+    return lambda: decrypt_seed(encrypted, BENCH_ENCRYPTION_KEY)
+
+
+def _bench_bytes_to_digits_unbiased() -> Callable[[], None]:
+    from src.utils.convert import bytes_to_digits_unbiased
+
+    # Every other byte is rejected, so the sampler has to walk the whole input
+    data = bytes([7, 250] * 16)
+    return lambda: bytes_to_digits_unbiased(data, 6)
+
+
+def _bench_verifier_cold_start() -> Callable[[], None]:
+    """Interpreter start + import + one verification, as an auditor script pays it."""
+    command = [sys.executable, "-m", "src.verifier", "bench_round_1", "a" * 64]
+    return lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+
+def _bench_verifier_serve() -> Callable[[], None]:
+    """One request/response round trip against a long-running --serve process."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.verifier", "--serve"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+    )
+    atexit.register(_stop_process, process)
+    request = json.dumps({"round_id": "bench_round_1", "server_seed": "a" * 64}) + "\n"
+
+    def roundtrip():
+        process.stdin.write(request)
+        process.stdout.readline()
+
+    return roundtrip
+
+
+def _stop_process(process: subprocess.Popen):
+    process.stdin.close()
+    process.wait(timeout=5)
+    process.stdout.close()
+
+
+def _bench_process_payout(db_url: str) -> Callable[[], None]:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.db.models import Base, User
+    from src.services.payout_service import PayoutService
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+
+    telegram_id = int(time.time() * 1000)
+    user = User(telegram_id=telegram_id, username="bench", balance=0)
+    db.add(user)
+    db.commit()
+
+    payout_service = PayoutService(db)
+    loop = asyncio.new_event_loop()
+    result = loop.run_until_complete(payout_service.process_payout(user.id, 1000, "bench_round_1"))
+    if not result['success']:
+        # Otherwise the benchmark would time the rollback path
+        raise RuntimeError(f"process_payout failed: {result['error']}")
+    return lambda: loop.run_until_complete(
+        payout_service.process_payout(user.id, 1000, "bench_round_1")
+    )
+
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {
+    "rng.compute_digits": _bench_compute_digits,
+    "rng.generate_server_seed": _bench_generate_server_seed,
+    "crypto.derive_key": _bench_derive_key,
+    "crypto.encrypt_seed": _bench_encrypt_seed,
+    "crypto.decrypt_seed": _bench_decrypt_seed,
+    "convert.bytes_to_digits_unbiased": _bench_bytes_to_digits_unbiased,
+    "verifier.cold_start": _bench_verifier_cold_start,
+    "verifier.serve_roundtrip": _bench_verifier_serve,
+}
+
+
+def _calibrate(func: Callable[[], None], min_time: float) -> int:
+    """Find a loop count whose total run time is at least min_time seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_time / 10 else 2
+
+
+def run_benchmark(func: Callable[[], None], repeat: int, min_time: float) -> Dict:
+    """Time func and return per-call statistics in microseconds."""
+    number = _calibrate(func, min_time)
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best_us": min(samples),
+        "median_us": statistics.median(samples),
+        "stdev_us": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def run_all(selected: Optional[List[str]], db_url: Optional[str],
+            repeat: int, min_time: float) -> Dict[str, Dict]:
+    benchmarks = dict(BENCHMARKS)
+    if db_url:
+        benchmarks["payout.process_payout"] = lambda: _bench_process_payout(db_url)
+    elif not selected or "payout.process_payout" in selected:
+        print("skipping payout.process_payout: set --db-url or BENCH_DATABASE_URL", file=sys.stderr)
+
+    results = {}
+    for name, setup in benchmarks.items():
+        if selected and name not in selected:
+            continue
+        results[name] = run_benchmark(setup(), repeat, min_time)
+        print(f"{name:40s} {results[name]['best_us']:12.2f} us  "
+              f"(median {results[name]['median_us']:.2f} us, n={results[name]['number']})")
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Return the names of benchmarks slower than baseline by more than tolerance."""
+    regressions = []
+    for name, current in results.items():
+        if name not in baseline:
+            print(f"{name:40s} no baseline")
+            continue
+        base_us = baseline[name]["best_us"]
+        ratio = current["best_us"] / base_us if base_us else float("inf")
+        flag = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"{name:40s} {base_us:12.2f} -> {current['best_us']:12.2f} us  {ratio:6.2f}x  {flag}")
+        if flag == "REGRESSION":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lottery hot paths")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare results against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed slowdown before flagging a regression (default 0.10 = 10%%)")
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="database for the payout benchmark (never point this at production)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="minimum seconds per timing sample")
+    parser.add_argument("benchmarks", nargs="*", help="only run these benchmarks")
+    args = parser.parse_args()
+
+    results = run_all(args.benchmarks, args.db_url, args.repeat, args.min_time)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({
+                "created_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Offline capacity-planning simulator.
+
+Generates synthetic bet streams, draws every round's digits with the real
+derivation (src.verifier, the code RNGService runs) and projects database
+write rate, pot growth, payout volume and settlement time.
+
+Usage:
+    python -m tools.capacity_sim --rounds 2000000 --chats 50 --workers 8
+    python -m tools.capacity_sim --rounds 100000 --replay-db sqlite:///./sim.db --replay-rounds 200
+
+Rounds are evaluated in batches spread over worker processes. Each batch
+returns only aggregates, so memory does not grow with --rounds. Results
+are deterministic for a given --seed. --replay-db runs the first
+--replay-rounds rounds' payouts through PayoutService against a local
+database and uses the measured cost per payout for the settlement estimate.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.verifier import compute_digits, outcome
+
+load_dotenv()
+
+BET_TYPES = ('small', 'big', 'even', 'odd')
+
+# Statements issued per event by the current code paths
+WRITES_PER_ROUND = 3    # provable_seeds insert, reveal update, round_client_seeds insert
+WRITES_PER_BET = 5      # bets insert, users balance update, user/chat/daily stats upserts
+WRITES_PER_PAYOUT = 9   # payouts insert, users update, pot update, audit_logs insert,
+                        # outbox insert, user/chat/daily stats upserts, payout status update
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        return max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+    # Knuth's method is fine for small means
+    limit = math.exp(-mean)
+    k, p = 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _bet_amount(rng: random.Random, min_bet: int, max_multiple: int) -> int:
+    # Heavy-tailed: most bets near the minimum, a few large ones
+    return min_bet * min(max_multiple, int(rng.paretovariate(1.5)))
+
+
+def round_server_seed(sim_seed: int, round_index: int) -> str:
+    return hashlib.sha256(f"{sim_seed}:{round_index}".encode()).hexdigest()
+
+
+def round_bets(rng: random.Random, params: Dict) -> List[Tuple[int, str, int]]:
+    """Synthetic (user_index, bet_type, amount) for one round."""
+    bettors = _poisson(rng, params['bettors_per_round'])
+    bets = []
+    for _ in range(bettors):
+        user_index = rng.randrange(params['users'])
+        for _ in range(1 + _poisson(rng, params['extra_bets_per_bettor'])):
+            bets.append((user_index, rng.choice(BET_TYPES), _bet_amount(rng, params['min_bet'], params['max_bet_multiple'])))
+    return bets
+
+
+def is_win(bet_type: str, result: Dict[str, str]) -> bool:
+    return bet_type == result['size'] or bet_type == result['parity']
+
+
+def simulate_batch(args: Tuple[int, int, Dict]) -> Dict:
+    """Simulate rounds [start, start + count) and return aggregates only."""
+    start, count, params = args
+    rng = random.Random(f"{params['seed']}:{start}")
+    totals = {
+        'rounds': 0, 'bets': 0, 'payouts': 0,
+        'wagered': 0, 'paid': 0, 'pot': 0,
+        'max_bets_per_round': 0, 'max_payouts_per_round': 0,
+        'payouts_per_round_hist': {},
+        'last_digit_hist': [0] * 10,
+    }
+
+    for round_index in range(start, start + count):
+        round_id = f"{round_index % params['chats']}_{round_index}"
+        digits = compute_digits(round_server_seed(params['seed'], round_index), round_id)
+        result = outcome(digits)
+        totals['last_digit_hist'][digits[-1]] += 1
+
+        bets = round_bets(rng, params)
+        payouts = 0
+        for _, bet_type, amount in bets:
+            totals['wagered'] += amount
+            if is_win(bet_type, result):
+                payout = int(amount * params['win_multiplier'])
+                totals['paid'] += payout
+                totals['pot'] += int(payout * params['house_rate'])
+                payouts += 1
+
+        totals['rounds'] += 1
+        totals['bets'] += len(bets)
+        totals['payouts'] += payouts
+        totals['max_bets_per_round'] = max(totals['max_bets_per_round'], len(bets))
+        totals['max_payouts_per_round'] = max(totals['max_payouts_per_round'], payouts)
+        hist = totals['payouts_per_round_hist']
+        hist[payouts] = hist.get(payouts, 0) + 1
+
+    return totals
+
+
+def merge(a: Dict, b: Dict) -> Dict:
+    for key in ('rounds', 'bets', 'payouts', 'wagered', 'paid', 'pot'):
+        a[key] += b[key]
+    for key in ('max_bets_per_round', 'max_payouts_per_round'):
+        a[key] = max(a[key], b[key])
+    for payouts, rounds in b['payouts_per_round_hist'].items():
+        a['payouts_per_round_hist'][payouts] = a['payouts_per_round_hist'].get(payouts, 0) + rounds
+    a['last_digit_hist'] = [x + y for x, y in zip(a['last_digit_hist'], b['last_digit_hist'])]
+    return a
+
+
+def _percentile(hist: Dict[int, int], fraction: float) -> int:
+    total = sum(hist.values())
+    seen = 0
+    for value in sorted(hist):
+        seen += hist[value]
+        if seen >= fraction * total:
+            return value
+    return 0
+
+
+def replay_payouts(db_url: str, params: Dict, rounds: int) -> Optional[float]:
+    """
+    Settle the first `rounds` simulated rounds through PayoutService. Returns
+    ms per payout; raises RuntimeError if any payout fails.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.db.models import Base, User
+    from src.services.payout_service import PayoutService
+    from src.services.stats_service import StatsService
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+
+    telegram_base = int(time.time() * 1000) * 1000
+    users = [User(telegram_id=telegram_base + i, username=f"sim{i}", balance=0)
+             for i in range(min(params['users'], 10000))]
+    db.add_all(users)
+    db.commit()
+    user_ids = [user.id for user in users]
+
+    payout_service = PayoutService(db, params['house_rate'], stats_service=StatsService(db))
+    rng = random.Random(f"{params['seed']}:replay")
+    loop = asyncio.new_event_loop()
+    payouts = 0
+    elapsed = 0.0
+
+    for round_index in range(rounds):
+        chat_id = round_index % params['chats']
+        round_id = f"{chat_id}_{round_index}"
+        result = outcome(compute_digits(round_server_seed(params['seed'], round_index), round_id))
+        for user_index, bet_type, amount in round_bets(rng, params):
+            if not is_win(bet_type, result):
+                continue
+            started = time.perf_counter()
+            payout = loop.run_until_complete(payout_service.process_payout(
+                user_ids[user_index % len(user_ids)], int(amount * params['win_multiplier']),
+                round_id, chat_id=chat_id
+            ))
+            elapsed += time.perf_counter() - started
+            if not payout['success']:
+                # Timing the rollback path would understate the real cost
+                loop.close()
+                db.close()
+                raise RuntimeError(f"Replayed payout failed in round {round_id}: {payout['error']}")
+            payouts += 1
+
+    loop.close()
+    db.close()
+    return elapsed / payouts * 1000 if payouts else None
+
+
+def build_report(totals: Dict, params: Dict, payout_ms: float, wall_seconds: float) -> Dict:
+    rounds_per_second = params['chats'] / params['round_seconds']
+    bets_per_round = totals['bets'] / totals['rounds']
+    payouts_per_round = totals['payouts'] / totals['rounds']
+    writes_per_round = WRITES_PER_ROUND + bets_per_round * WRITES_PER_BET + payouts_per_round * WRITES_PER_PAYOUT
+    simulated_seconds = totals['rounds'] / rounds_per_second
+    hist = totals['payouts_per_round_hist']
+
+    return {
+        'params': params,
+        'simulation': {
+            'rounds': totals['rounds'],
+            'wall_seconds': round(wall_seconds, 2),
+            'rounds_per_wall_second': round(totals['rounds'] / wall_seconds) if wall_seconds else None,
+            'simulated_days': round(simulated_seconds / 86400, 2),
+            'last_digit_hist': totals['last_digit_hist'],
+        },
+        'load': {
+            'rounds_per_second': rounds_per_second,
+            'bets_per_second': rounds_per_second * bets_per_round,
+            'payouts_per_second': rounds_per_second * payouts_per_round,
+            'db_writes_per_second': rounds_per_second * writes_per_round,
+            'max_bets_per_round': totals['max_bets_per_round'],
+        },
+        'settlement': {
+            'payout_ms': payout_ms,
+            'payouts_per_round_p50': _percentile(hist, 0.50),
+            'payouts_per_round_p99': _percentile(hist, 0.99),
+            'payouts_per_round_max': totals['max_payouts_per_round'],
+            'settlement_ms_p50': _percentile(hist, 0.50) * payout_ms,
+            'settlement_ms_p99': _percentile(hist, 0.99) * payout_ms,
+            'settlement_ms_max': totals['max_payouts_per_round'] * payout_ms,
+            # Payouts are settled one user lock at a time, so a round must
+            # settle well inside ROUND_SECONDS
+            'p99_fraction_of_round': _percentile(hist, 0.99) * payout_ms / 1000 / params['round_seconds'],
+        },
+        'ledger': {
+            'wagered': totals['wagered'],
+            'paid': totals['paid'],
+            'house_net': totals['wagered'] - totals['paid'],
+            'return_to_player': totals['paid'] / totals['wagered'] if totals['wagered'] else None,
+            'pot_growth': totals['pot'],
+            'pot_growth_per_day': totals['pot'] / simulated_seconds * 86400 if simulated_seconds else None,
+            'payout_volume_per_day': totals['paid'] / simulated_seconds * 86400 if simulated_seconds else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate rounds and project load and ledger figures")
+    parser.add_argument("--rounds", type=int, default=1_000_000)
+    parser.add_argument("--chats", type=int, default=20, help="concurrently active chats")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--bettors-per-round", type=float, default=8.0)
+    parser.add_argument("--extra-bets-per-bettor", type=float, default=0.5)
+    parser.add_argument("--max-bet-multiple", type=int, default=1000)
+    parser.add_argument("--round-seconds", type=float, default=float(os.getenv('ROUND_SECONDS', 60)))
+    parser.add_argument("--min-bet", type=int, default=int(os.getenv('MIN_BET', 1000)))
+    parser.add_argument("--win-multiplier", type=float, default=float(os.getenv('WIN_MULTIPLIER', 1.97)))
+    parser.add_argument("--house-rate", type=float, default=float(os.getenv('HOUSE_RATE', 0.03)))
+    parser.add_argument("--payout-ms", type=float, default=5.0,
+                        help="cost of one payout when not measured with --replay-db")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replay-db", help="local database to measure real settlement cost on")
+    parser.add_argument("--replay-rounds", type=int, default=100)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    for name in ('rounds', 'chats', 'users', 'workers', 'batch_size', 'replay_rounds'):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+
+    params = {
+        'seed': args.seed,
+        'chats': args.chats,
+        'users': args.users,
+        'bettors_per_round': args.bettors_per_round,
+        'extra_bets_per_bettor': args.extra_bets_per_bettor,
+        'max_bet_multiple': args.max_bet_multiple,
+        'round_seconds': args.round_seconds,
+        'min_bet': args.min_bet,
+        'win_multiplier': args.win_multiplier,
+        'house_rate': args.house_rate,
+    }
+
+    started = time.perf_counter()
+    batches = [
+        (start, min(args.batch_size, args.rounds - start), params)
+        for start in range(0, args.rounds, args.batch_size)
+    ]
+    totals = None
+    with Pool(processes=args.workers) as pool:
+        for batch in pool.imap_unordered(simulate_batch, batches):
+            totals = batch if totals is None else merge(totals, batch)
+    wall_seconds = time.perf_counter() - started
+
+    payout_ms = args.payout_ms
+    if args.replay_db:
+        try:
+            measured = replay_payouts(args.replay_db, params, args.replay_rounds)
+        except RuntimeError as e:
+            sys.exit(f"❌ {e}")
+        if measured is not None:
+            payout_ms = measured
+
+    report = build_report(totals, params, payout_ms, wall_seconds)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
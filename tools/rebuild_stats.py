@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Rebuild user_stats, chat_stats, daily_stats and the Redis leaderboards from
+bets and payouts.
+
+Usage:
+    python -m tools.rebuild_stats [--no-redis]
+
+Run it once to backfill after the stats migration, or whenever the Redis
+leaderboards may have drifted. The SQL part runs in a single transaction with
+INSERT ... SELECT, so no rows pass through Python.
+"""
+import argparse
+import os
+
+import redis
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from src.db.models import Bet, Payout, PayoutStatus, UserStats, ChatStats, DailyStats, User
+from src.services.stats_service import LEADERBOARDS, leaderboard_key
+
+load_dotenv()
+
+REDIS_BATCH = 5000
+
+
+def _contributions():
+    """One row per bet and per done payout with the columns every aggregate needs."""
+    # Payouts carry no chat_id; take it from the bets of the same round,
+    # as StatsService.round_chat_id does for the incremental path
+    round_chats = select(Bet.round_id, func.min(Bet.chat_id).label('chat_id')) \
+        .group_by(Bet.round_id).subquery()
+
+    bets = select(
+        Bet.user_id.label('user_id'),
+        Bet.chat_id.label('chat_id'),
+        func.date(Bet.created_at).label('day'),
+        literal(1).label('bets_count'),
+        Bet.amount.label('wagered'),
+        literal(0).label('payouts_count'),
+        literal(0).label('payouts_total'),
+    )
+    payouts = select(
+        Payout.user_id,
+        round_chats.c.chat_id,
+        func.date(func.coalesce(Payout.completed_at, Payout.created_at)),
+        literal(0),
+        literal(0),
+        literal(1),
+        Payout.amount,
+    ).outerjoin(round_chats, round_chats.c.round_id == Payout.round_id) \
+        .where(Payout.status == PayoutStatus.DONE.value)
+
+    return union_all(bets, payouts).subquery()
+
+
+def rebuild_tables(db: Session):
+    contributions = _contributions()
+    counters = [
+        func.sum(contributions.c.bets_count),
+        func.sum(contributions.c.wagered),
+        func.sum(contributions.c.payouts_count),
+        func.sum(contributions.c.payouts_total),
+    ]
+    counter_names = ['bets_count', 'wagered', 'payouts_count', 'payouts_total']
+
+    for model, key_column, key_name in (
+        (UserStats, contributions.c.user_id, 'user_id'),
+        (ChatStats, contributions.c.chat_id, 'chat_id'),
+        (DailyStats, contributions.c.day, 'day'),
+    ):
+        query = select(key_column, *counters).where(key_column.isnot(None)).group_by(key_column)
+        if model is UserStats:
+            query = query.where(key_column.in_(select(User.id)))
+
+        db.execute(delete(model))
+        db.execute(insert(model).from_select([key_name] + counter_names, query))
+
+
+def rebuild_leaderboards(db: Session, redis_client):
+    """Replace the global leaderboards from user_stats, then per-chat ones from bets/payouts."""
+    for board, column in (('won', UserStats.payouts_total), ('wagered', UserStats.wagered)):
+        key = leaderboard_key(board)
+        tmp_key = key + ':rebuild'
+        redis_client.delete(tmp_key)
+
+        mapping = {}
+        rows = db.execute(
+            select(UserStats.user_id, column).where(column > 0)
+            .execution_options(yield_per=REDIS_BATCH)
+        )
+        for user_id, score in rows:
+            mapping[user_id] = score
+            if len(mapping) >= REDIS_BATCH:
+                redis_client.zadd(tmp_key, mapping)
+                mapping = {}
+        if mapping:
+            redis_client.zadd(tmp_key, mapping)
+
+        if redis_client.exists(tmp_key):
+            redis_client.rename(tmp_key, key)
+        else:
+            redis_client.delete(key)
+
+    contributions = _contributions()
+    for key in redis_client.scan_iter(match=leaderboard_key('*', '*')):
+        redis_client.delete(key)
+
+    rows = db.execute(
+        select(
+            contributions.c.chat_id,
+            contributions.c.user_id,
+            func.sum(contributions.c.payouts_total),
+            func.sum(contributions.c.wagered),
+        ).where(contributions.c.chat_id.isnot(None))
+        .group_by(contributions.c.chat_id, contributions.c.user_id)
+        .execution_options(yield_per=REDIS_BATCH)
+    )
+    pipe = redis_client.pipeline(transaction=False)
+    for index, (chat_id, user_id, won, wagered) in enumerate(rows, 1):
+        for board, score in zip(LEADERBOARDS, (won, wagered)):
+            if score:
+                pipe.zadd(leaderboard_key(board, chat_id), {user_id: score})
+        if index % REDIS_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild statistics aggregates and leaderboards")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL', 'sqlite:///./lottery.db'))
+    parser.add_argument("--redis-url", default=os.getenv('REDIS_URL'))
+    parser.add_argument("--no-redis", action="store_true", help="only rebuild the SQL tables")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    with Session(engine) as db:
+        rebuild_tables(db)
+        db.commit()
+        print(f"✅ Rebuilt stats for {db.query(UserStats).count()} users")
+
+        if args.redis_url and not args.no_redis:
+            rebuild_leaderboards(db, redis.Redis.from_url(args.redis_url))
+            print("✅ Rebuilt leaderboards")
+
+
+if __name__ == '__main__':
+    main()
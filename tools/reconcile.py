@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Balance reconciliation.
+
+Checks that every user's balance equals
+
+    START_BONUS - sum(bets.amount) + sum(payouts.amount where status = 'done')
+
+Usage:
+    python -m tools.reconcile --workers 4 --report reconcile_report.jsonl
+    python -m tools.reconcile --incremental --checkpoint reconcile_checkpoint.json
+
+Full mode splits the users.id range into one partition per worker process.
+Each partition merge-walks three server-side cursors ordered by user id
+(users, per-user bet totals, per-user payout totals), so memory stays
+constant regardless of table size. Incremental mode only checks users with
+balance, bet or payout activity since the last checkpoint, plus the users
+whose discrepancies the checkpoint still lists as open, so a known mismatch
+keeps failing the run until it is fixed.
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+from datetime import datetime
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, func, or_, select, union
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import NullPool
+
+from src.db.models import User, Bet, Payout, PayoutStatus
+
+load_dotenv()
+
+YIELD_PER = 5000
+INCREMENTAL_CHUNK = 1000
+
+
+def _engine(db_url: str) -> Engine:
+    # Each worker process opens its own connections
+    return create_engine(db_url, poolclass=NullPool)
+
+
+def _stream(conn: Connection, query) -> Iterator[Tuple]:
+    result = conn.execution_options(stream_results=True, yield_per=YIELD_PER).execute(query)
+    for row in result:
+        yield tuple(row)
+
+
+def _users_query(id_filter):
+    return select(User.id, User.balance).where(id_filter).order_by(User.id)
+
+
+def _bet_totals_query(id_filter):
+    return (
+        select(Bet.user_id, func.sum(Bet.amount))
+        .where(id_filter)
+        .group_by(Bet.user_id)
+        .order_by(Bet.user_id)
+    )
+
+
+def _payout_totals_query(id_filter):
+    return (
+        select(Payout.user_id, func.sum(Payout.amount))
+        .where(id_filter, Payout.status == PayoutStatus.DONE.value)
+        .group_by(Payout.user_id)
+        .order_by(Payout.user_id)
+    )
+
+
+def merge_walk(users: Iterator[Tuple], bet_totals: Iterator[Tuple],
+               payout_totals: Iterator[Tuple], start_bonus: int) -> Iterator[Dict]:
+    """
+    Merge three streams ordered by user id and yield discrepancies.
+    Bet or payout totals without a matching user row are reported as orphans.
+    """
+    bet = next(bet_totals, None)
+    payout = next(payout_totals, None)
+
+    for user_id, balance in users:
+        while bet is not None and bet[0] < user_id:
+            yield {'user_id': bet[0], 'kind': 'orphan_bets', 'bets_total': int(bet[1])}
+            bet = next(bet_totals, None)
+        while payout is not None and payout[0] < user_id:
+            yield {'user_id': payout[0], 'kind': 'orphan_payouts', 'payouts_total': int(payout[1])}
+            payout = next(payout_totals, None)
+
+        bets_total = 0
+        if bet is not None and bet[0] == user_id:
+            bets_total = int(bet[1] or 0)
+            bet = next(bet_totals, None)
+        payouts_total = 0
+        if payout is not None and payout[0] == user_id:
+            payouts_total = int(payout[1] or 0)
+            payout = next(payout_totals, None)
+
+        expected = start_bonus - bets_total + payouts_total
+        balance = int(balance or 0)
+        if balance != expected:
+            yield {
+                'user_id': user_id,
+                'kind': 'balance_mismatch',
+                'balance': balance,
+                'expected': expected,
+                'diff': balance - expected,
+                'bets_total': bets_total,
+                'payouts_total': payouts_total,
+            }
+
+    while bet is not None:
+        yield {'user_id': bet[0], 'kind': 'orphan_bets', 'bets_total': int(bet[1])}
+        bet = next(bet_totals, None)
+    while payout is not None:
+        yield {'user_id': payout[0], 'kind': 'orphan_payouts', 'payouts_total': int(payout[1])}
+        payout = next(payout_totals, None)
+
+
+def _reconcile_filter(engine: Engine, user_filter, bet_filter, payout_filter,
+                      start_bonus: int, out) -> Tuple[int, int]:
+    """Run one merge walk and write discrepancies to out. Returns (checked, discrepancies)."""
+    checked = 0
+    discrepancies = 0
+
+    with engine.connect() as users_conn, engine.connect() as bets_conn, \
+            engine.connect() as payouts_conn:
+        def counted_users():
+            nonlocal checked
+            for row in _stream(users_conn, _users_query(user_filter)):
+                checked += 1
+                yield row
+
+        for item in merge_walk(
+            counted_users(),
+            _stream(bets_conn, _bet_totals_query(bet_filter)),
+            _stream(payouts_conn, _payout_totals_query(payout_filter)),
+            start_bonus,
+        ):
+            out.write(json.dumps(item) + '\n')
+            discrepancies += 1
+
+    return checked, discrepancies
+
+
+def reconcile_partition(args: Tuple[str, int, int, int, str]) -> Dict:
+    """Worker: reconcile users with lo <= id < hi into a partition report file."""
+    db_url, lo, hi, start_bonus, part_path = args
+    engine = _engine(db_url)
+    try:
+        with open(part_path, 'w') as out:
+            checked, discrepancies = _reconcile_filter(
+                engine,
+                (User.id >= lo) & (User.id < hi),
+                (Bet.user_id >= lo) & (Bet.user_id < hi),
+                (Payout.user_id >= lo) & (Payout.user_id < hi),
+                start_bonus, out,
+            )
+    finally:
+        engine.dispose()
+    return {'lo': lo, 'hi': hi, 'checked': checked, 'discrepancies': discrepancies, 'path': part_path}
+
+
+def partition_ranges(min_id: int, max_id: int, partitions: int) -> List[Tuple[int, int]]:
+    """Split [min_id, max_id] into contiguous half-open ranges."""
+    span = max_id - min_id + 1
+    step = max(1, -(-span // partitions))
+    return [(lo, min(lo + step, max_id + 1)) for lo in range(min_id, max_id + 1, step)]
+
+
+def _id_bounds(engine: Engine) -> Optional[Tuple[int, int]]:
+    with engine.connect() as conn:
+        ids = [
+            conn.execute(select(func.min(column), func.max(column))).one()
+            for column in (User.id, Bet.user_id, Payout.user_id)
+        ]
+    lows = [low for low, _ in ids if low is not None]
+    highs = [high for _, high in ids if high is not None]
+    if not lows:
+        return None
+    return min(lows), max(highs)
+
+
+def run_full(db_url: str, workers: int, start_bonus: int, report_path: str) -> Dict:
+    engine = _engine(db_url)
+    bounds = _id_bounds(engine)
+    engine.dispose()
+
+    summary = {'mode': 'full', 'checked': 0, 'discrepancies': 0}
+    if bounds is None:
+        open(report_path, 'w').close()
+        return summary
+
+    tasks = [
+        (db_url, lo, hi, start_bonus, f"{report_path}.part{index}")
+        for index, (lo, hi) in enumerate(partition_ranges(bounds[0], bounds[1], workers))
+    ]
+    with Pool(processes=workers) as pool:
+        parts = pool.map(reconcile_partition, tasks)
+
+    with open(report_path, 'w') as out:
+        for part in parts:
+            with open(part['path']) as f:
+                for line in f:
+                    out.write(line)
+            os.remove(part['path'])
+            summary['checked'] += part['checked']
+            summary['discrepancies'] += part['discrepancies']
+    return summary
+
+
+def _touched_user_ids(conn: Connection, since: datetime) -> Iterator[int]:
+    query = union(
+        select(User.id.label('user_id')).where(User.updated_at >= since),
+        select(Bet.user_id).where(Bet.created_at >= since),
+        select(Payout.user_id).where(or_(Payout.created_at >= since, Payout.completed_at >= since)),
+    ).order_by('user_id')
+    for row in _stream(conn, query):
+        yield row[0]
+
+
+def _unique(ids: Iterable[int]) -> Iterator[int]:
+    previous = None
+    for user_id in ids:
+        if user_id != previous:
+            yield user_id
+            previous = user_id
+
+
+def run_incremental(db_url: str, start_bonus: int, report_path: str, since: datetime,
+                    open_user_ids: Iterable[int] = ()) -> Dict:
+    engine = _engine(db_url)
+    summary = {'mode': 'incremental', 'since': since.isoformat(), 'checked': 0, 'discrepancies': 0}
+
+    def check_chunk(chunk, out):
+        checked, discrepancies = _reconcile_filter(
+            engine, User.id.in_(chunk), Bet.user_id.in_(chunk), Payout.user_id.in_(chunk),
+            start_bonus, out,
+        )
+        summary['checked'] += checked
+        summary['discrepancies'] += discrepancies
+
+    try:
+        with engine.connect() as conn, open(report_path, 'w') as out:
+            chunk = []
+            for user_id in _unique(heapq.merge(_touched_user_ids(conn, since), sorted(open_user_ids))):
+                chunk.append(user_id)
+                if len(chunk) >= INCREMENTAL_CHUNK:
+                    check_chunk(chunk, out)
+                    chunk = []
+            if chunk:
+                check_chunk(chunk, out)
+    finally:
+        engine.dispose()
+    return summary
+
+
+def _db_now(db_url: str) -> datetime:
+    # Use the database clock so the checkpoint matches the timestamps it is compared against
+    engine = _engine(db_url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.now())).scalar()
+    finally:
+        engine.dispose()
+
+
+def _report_user_ids(report_path: str) -> List[int]:
+    with open(report_path) as f:
+        return sorted({json.loads(line)['user_id'] for line in f if line.strip()})
+
+
+def reconcile(db_url: str, workers: int, start_bonus: int, report_path: str,
+              checkpoint_path: str, incremental: bool = False) -> Dict:
+    """
+    Run a full or incremental pass and write the checkpoint. The checkpoint
+    records the users with open discrepancies so the next incremental pass
+    checks them again even if they had no new activity.
+    """
+    started_at = _db_now(db_url)
+
+    if incremental and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        summary = run_incremental(
+            db_url, start_bonus, report_path,
+            datetime.fromisoformat(checkpoint['checked_at']),
+            checkpoint.get('open_user_ids', []),
+        )
+    else:
+        summary = run_full(db_url, workers, start_bonus, report_path)
+
+    with open(checkpoint_path, 'w') as f:
+        json.dump({'checked_at': started_at.isoformat(), 'open_user_ids': _report_user_ids(report_path)}, f)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile user balances against bets and payouts")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL', 'sqlite:///./lottery.db'))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start-bonus", type=int, default=int(os.getenv('START_BONUS', 80000)))
+    parser.add_argument("--report", default="reconcile_report.jsonl")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only check users touched since the last checkpoint")
+    parser.add_argument("--checkpoint", default="reconcile_checkpoint.json")
+    args = parser.parse_args()
+
+    summary = reconcile(args.db_url, args.workers, args.start_bonus, args.report,
+                        args.checkpoint, args.incremental)
+
+    print(json.dumps(summary))
+    if summary['discrepancies']:
+        print(f"❌ {summary['discrepancies']} discrepancies written to {args.report}")
+        sys.exit(1)
+    print("✅ All balances reconcile")
+
+
+if __name__ == '__main__':
+    main()
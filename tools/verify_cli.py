@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 import sys
-import hashlib
-from src.services.rng_service import RNGService
-from src.utils.crypto import decrypt_seed
+from src.verifier import commitment_for, compute_digits, outcome
 
 def main():
     if len(sys.argv) < 4:
         print("Usage: python verify_cli.py <round_id> <revealed_seed> <published_commitment> [client_seed]")
         print("Example: python verify_cli.py chat123_1 abc123... a1b2c3... my_client_seed")
+        print("For bulk verification use: python -m src.verifier --serve < requests.jsonl")
         sys.exit(1)
     
     round_id = sys.argv[1]
@@ -15,11 +14,9 @@ def main():
     published_commitment = sys.argv[3]
     client_seed = sys.argv[4] if len(sys.argv) > 4 else None
     
-    rng_service = RNGService("dummy-key")  # Key not needed for verification
-    
     try:
         # Verify commitment matches revealed seed
-        computed_commitment = hashlib.sha256(revealed_seed.encode()).hexdigest()
+        computed_commitment = commitment_for(revealed_seed)
         
         if computed_commitment != published_commitment:
             print("❌ COMMITMENT VERIFICATION FAILED!")
@@ -30,25 +27,15 @@ def main():
         print("✅ Commitment verification passed")
         
         # Compute digits
-        digits = rng_service.compute_digits(revealed_seed, round_id, client_seed)
+        digits = compute_digits(revealed_seed, round_id, client_seed)
         
         print(f"📊 Round ID: {round_id}")
         print(f"🔢 Computed digits: {''.join(map(str, digits))}")
         print(f"🎯 Last digit: {digits[-1]}")
         
         # Determine outcome
-        last_digit = digits[-1]
-        if last_digit in [0, 1, 2, 3, 4]:
-            size = "SMALL"
-        else:
-            size = "BIG"
-            
-        if last_digit % 2 == 0:
-            parity = "EVEN"
-        else:
-            parity = "ODD"
-            
-        print(f"📈 Result: {size} ({parity})")
+        result = outcome(digits)
+        print(f"📈 Result: {result['size'].upper()} ({result['parity'].upper()})")
         print("✅ Verification completed successfully")
         
     except Exception as e: